@@ -0,0 +1,62 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+from app.core.config import settings
+from app.database import Base
+from app import models  # noqa: F401 — регистрирует таблицы в Base.metadata
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logging", True):
+    fileConfig(config.config_file_name)
+
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+target_metadata = Base.metadata
+
+# Поисковый индекс создаётся миграцией вручную (FTS5 / tsvector) и в моделях не описан
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not (name or "").startswith("cards_fts")
+    if type_ == "column":
+        return name != "search_vector"
+    return True
+
+
+# SQLite не умеет большинство ALTER TABLE — такие изменения идут через пересоздание таблицы
+render_as_batch = settings.DATABASE_URL.startswith("sqlite")
+
+
+def run_migrations_offline():
+    """Генерирует SQL без подключения к БД (alembic upgrade head --sql)"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=render_as_batch,
+        include_name=include_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=render_as_batch,
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,87 @@
+"""initial schema
+
+Схема исходной версии приложения (Base.metadata.create_all): users, decks и cards.
+Базы, созданные create_all, помечаются этой ревизией (`alembic stamp 0001`,
+upgrade_schema делает это сам), а дальнейшие изменения приносит 0001a.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 17:26:48.034670
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+    op.create_table('decks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('decks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_decks_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_decks_user_id'), ['user_id'], unique=False)
+
+    op.create_table('cards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('answer', sa.Text(), nullable=False),
+    sa.Column('deck_id', sa.Integer(), nullable=False),
+    sa.Column('ease_factor', sa.Float(), nullable=True),
+    sa.Column('interval', sa.Integer(), nullable=True),
+    sa.Column('repetitions', sa.Integer(), nullable=True),
+    sa.Column('next_review', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['deck_id'], ['decks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cards_deck_id'), ['deck_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_cards_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('cards', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cards_id'))
+        batch_op.drop_index(batch_op.f('ix_cards_deck_id'))
+
+    op.drop_table('cards')
+    with op.batch_alter_table('decks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_decks_user_id'))
+        batch_op.drop_index(batch_op.f('ix_decks_id'))
+
+    op.drop_table('decks')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
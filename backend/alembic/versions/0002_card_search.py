@@ -0,0 +1,95 @@
+"""card full-text search
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+
+# SQLite: отдельная таблица FTS5 со своей копией текста. Колонка scope («u<user> d<deck>»)
+# ограничивает поиск пользователем и колодой прямо в индексе — пересечение списков
+# документов вместо перебора совпадений всех пользователей.
+# Триггеры держат индекс в актуальном состоянии при любых записях, включая пачки импорта.
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE cards_fts USING fts5(
+        question, answer, scope,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER cards_fts_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts(rowid, question, answer, scope)
+        SELECT new.id, new.question, new.answer, 'u' || decks.user_id || ' d' || decks.id FROM decks WHERE decks.id = new.deck_id;
+    END
+    """,
+    """
+    CREATE TRIGGER cards_fts_update AFTER UPDATE OF question, answer, deck_id ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+        INSERT INTO cards_fts(rowid, question, answer, scope)
+        SELECT new.id, new.question, new.answer, 'u' || decks.user_id || ' d' || decks.id FROM decks WHERE decks.id = new.deck_id;
+    END
+    """,
+    """
+    CREATE TRIGGER cards_fts_delete AFTER DELETE ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO cards_fts(rowid, question, answer, scope)
+    SELECT cards.id, cards.question, cards.answer, 'u' || decks.user_id || ' d' || decks.id
+    FROM cards JOIN decks ON decks.id = cards.deck_id
+    """,
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS cards_fts_delete",
+    "DROP TRIGGER IF EXISTS cards_fts_update",
+    "DROP TRIGGER IF EXISTS cards_fts_insert",
+    "DROP TABLE IF EXISTS cards_fts",
+]
+
+# Postgres: вычисляемый tsvector (вопрос весомее ответа) и GIN-индекс по нему
+POSTGRES_UPGRADE = [
+    """
+    ALTER TABLE cards ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(question, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(answer, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_cards_search_vector ON cards USING gin (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_cards_search_vector",
+    "ALTER TABLE cards DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _statements(sqlite: list, postgres: list) -> list:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite
+    if dialect == "postgresql":
+        return postgres
+    return []
+
+
+def upgrade() -> None:
+    for statement in _statements(SQLITE_UPGRADE, POSTGRES_UPGRADE):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in _statements(SQLITE_DOWNGRADE, POSTGRES_DOWNGRADE):
+        op.execute(statement)
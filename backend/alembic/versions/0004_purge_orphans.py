@@ -0,0 +1,41 @@
+"""purge rows orphaned before foreign keys were enforced
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 18:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+# До PRAGMA foreign_keys=ON SQLite не выполнял ON DELETE CASCADE: у удалённых колод
+# оставались карточки, а у них — ссылки на медиа. Счётчики ссылок блобов пересчитываются
+# по оставшимся ссылкам. Postgres внешние ключи соблюдал всегда.
+SQLITE_UPGRADE = [
+    "DELETE FROM decks WHERE user_id NOT IN (SELECT id FROM users)",
+    "DELETE FROM cards WHERE deck_id NOT IN (SELECT id FROM decks)",
+    "DELETE FROM card_media WHERE card_id NOT IN (SELECT id FROM cards)",
+    """
+    UPDATE media_blobs SET ref_count = (
+        SELECT count(*) FROM card_media WHERE card_media.blob_name = media_blobs.name
+    )
+    """,
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    # Удалённые строки не восстановить, да и ссылаться им было не на что
+    pass
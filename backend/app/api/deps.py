@@ -0,0 +1,87 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import ALGORITHM, SECRET_KEY
+from app.database import AsyncSessionLocal
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Снимок пользователя из токена: живёт в кэше дольше одной сессии БД"""
+    id: int
+    email: str
+    username: str
+    created_at: datetime
+    updated_at: datetime
+
+
+# Токен -> пользователь. Запись живёт не дольше самого токена и AUTH_CACHE_TTL.
+# Кэш у каждого воркера свой и явно не сбрасывается: если пользователя изменят
+# или удалят в БД, его старые данные и токены принимаются ещё до AUTH_CACHE_TTL секунд
+_token_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL, max_entries=settings.AUTH_CACHE_SIZE)
+
+_credentials_error = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Не удалось проверить учётные данные",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """Пользователь по Bearer-токену; повторные запросы с тем же токеном не ходят в БД"""
+    user = _token_cache.get(token)
+    if user is not None:
+        return user
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(payload["user_id"])
+        expires_at = float(payload["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_error
+
+    async with AsyncSessionLocal() as db:
+        row = await db.get(models.User, user_id)
+    if row is None:
+        raise _credentials_error
+
+    user = CurrentUser(
+        id=row.id,
+        email=row.email,
+        username=row.username,
+        created_at=row.created_at,
+        updated_at=row.updated_at
+    )
+    _token_cache.set(token, user, ttl=expires_at - time.time())
+    return user
+
+
+async def get_owned_deck(db: AsyncSession, deck_id: int, user: CurrentUser) -> models.Deck:
+    """Колода текущего пользователя; чужая колода выглядит как несуществующая"""
+    deck = await db.get(models.Deck, deck_id)
+    if not deck or deck.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Колода не найдена")
+    return deck
+
+
+async def get_owned_card(db: AsyncSession, card_id: int, user: CurrentUser) -> models.Card:
+    """Карточка из колоды текущего пользователя"""
+    card = await db.scalar(
+        select(models.Card)
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Card.id == card_id, models.Deck.user_id == user.id)
+    )
+    if not card:
+        raise HTTPException(status_code=404, detail="Карточка не найдена")
+    return card
@@ -1,33 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.database import get_db
+from app.database import get_async_db
 from app import models
 from app.schemas.user import Token
-from app.core.security import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.services.password_service import password_hasher
+from app.services.write_queue import write_queue
 
 router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
         form_data: OAuth2PasswordRequestForm = Depends(),  # ← ✅ Исправлено: двоеточие после form_data
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Вход пользователя и получение токена"""
     # Поиск пользователя по username
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == form_data.username))
 
-    # Проверка пароля
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Проверка пароля (bcrypt считаем в отдельном пуле процессов, при перегрузке — 429)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный логин или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Сменилась стоимость bcrypt — незаметно для пользователя пересохраняем хеш
+    if new_hash:
+        async def job(session: AsyncSession):
+            stored = await session.get(models.User, user.id)
+            if stored is not None and stored.hashed_password == user.hashed_password:
+                stored.hashed_password = new_hash
+
+        await write_queue.submit(job)
+
     # Создание токена
     access_token = create_access_token(
         data={"sub": user.username, "user_id": user.id},
@@ -1,110 +1,350 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.database import get_db
+from app.database import get_async_db
 from app import models
-from app.services.srs_service import SRSService, SRSReview
-from app.schemas.card import CardResponse, CardCreate, ReviewResponse, ReviewCard, ReviewRequest, CardUpdate
+from app.api.deps import CurrentUser, get_current_user, get_owned_card, get_owned_deck
+from app.api.pagination import (
+    NDJSON_MEDIA_TYPE, encode_cursor, decode_cursor,
+    json_response, keyset_after, page_response, parse_fields, stream_ndjson
+)
+from app.services.bulk_service import delete_cards, move_cards
+from app.services.review_service import apply_reviews
+from app.services.search_service import search_cards
+from app.services.study_queue_service import study_queue_service
+from app.services.sync_service import add_tombstones
+from app.services.write_queue import write_queue
+from app.services.file_service import file_service
+from app.services.media_store import media_store
+from app.services.deck_stats_service import deck_stats_service
+from app.services.response_cache import response_cache
+from app.schemas.card import (
+    CardResponse, CardCreate, ReviewResponse, ReviewCard, ReviewRequest, CardUpdate,
+    ReviewBatchItem, ReviewBatchRequest, CardSearchHit, QueueCard,
+    CardIdsRequest, CardMoveRequest
+)
+from app.schemas.media import MediaResponse
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
 
 @router.post("/", response_model=CardResponse)
-def create_card(card: CardCreate, db: Session = Depends(get_db)):
+async def create_card(card: CardCreate, user: CurrentUser = Depends(get_current_user)):
     """Создание новой карточки"""
-    deck = db.query(models.Deck).filter(models.Deck.id == card.deck_id).first()
-    if not deck:
-        raise HTTPException(status_code=404, detail="Колода не найдена")
-
-    db_card = models.Card(
-        question=card.question,
-        answer=card.answer,
-        deck_id=card.deck_id,
-        ease_factor=2.5,
-        interval=0,
-        repetitions=0,
-        next_review=datetime.utcnow()
-    )
-    db.add(db_card)
-    db.commit()
-    db.refresh(db_card)
+    async def job(db: AsyncSession):
+        await get_owned_deck(db, card.deck_id, user)
+
+        db_card = models.Card(
+            question=card.question,
+            answer=card.answer,
+            deck_id=card.deck_id,
+            ease_factor=2.5,
+            interval=0,
+            repetitions=0,
+            next_review=datetime.utcnow()
+        )
+        db.add(db_card)
+        await db.flush()
+        await db.refresh(db_card)
+        return db_card
+
+    db_card = await write_queue.submit(job)
+    deck_stats_service.invalidate(db_card.deck_id)
+    await response_cache.bump_decks(db_card.deck_id)
     return db_card
 
 
 @router.put("/{card_id}", response_model=CardResponse)
-def update_card(card_id: int, card_update: CardUpdate, db: Session = Depends(get_db)):
+async def update_card(card_id: int, card_update: CardUpdate, user: CurrentUser = Depends(get_current_user)):
     """Обновление карточки"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if not card:
-        raise HTTPException(status_code=404, detail="Карточка не найдена")
+    async def job(db: AsyncSession):
+        card = await get_owned_card(db, card_id, user)
 
-    update_data = card_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(card, field, value)
+        update_data = card_update.dict(exclude_unset=True)
+        # Озвучка старого текста больше не подходит — её пересоздаст следующая озвучка колоды
+        stale_audio = [
+            f"{field}_audio_url" for field in ("question", "answer")
+            if field in update_data and update_data[field] != getattr(card, field)
+        ]
+        orphans = await media_store.clear_audio(db, card, *stale_audio)
+        for field, value in update_data.items():
+            setattr(card, field, value)
 
-    db.commit()
-    db.refresh(card)
+        await db.flush()
+        await db.refresh(card)
+        return card, orphans
+
+    card, orphans = await write_queue.submit(job)
+    await response_cache.bump_decks(card.deck_id)
+    await media_store.remove(orphans)
     return card
 
 
 @router.get("/review", response_model=list[ReviewCard])
-def get_review_cards(deck_id: int | None = None, db: Session = Depends(get_db)):
-    """Получить карточки для повторения по SRS"""
-    # Берём все карточки, у которых время следующего показа уже наступило
-    query = db.query(models.Card).filter(models.Card.next_review <= datetime.utcnow())
+async def get_review_cards(
+        deck_id: int | None = None,
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = None,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Получить карточки для повторения по SRS (самые просроченные — первыми)"""
+    # Берём карточки пользователя, у которых время следующего показа уже наступило
+    query = (
+        select(models.Card.id, models.Card.question, models.Card.answer, models.Card.deck_id, models.Card.next_review)
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Deck.user_id == user.id, models.Card.next_review <= datetime.utcnow())
+    )
 
-    # Если передан deck_id — фильтруем по колоде
+    # Если передан deck_id — фильтруем по колоде (индекс deck_id + next_review)
     if deck_id is not None:
-        query = query.filter(models.Card.deck_id == deck_id)
+        query = query.where(models.Card.deck_id == deck_id)
+
+    # Keyset-пагинация по (next_review, id): продолжаем строго после последней карточки
+    if cursor is not None:
+        after_review, after_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            models.Card.next_review >= after_review,
+            or_(
+                models.Card.next_review > after_review,
+                and_(models.Card.next_review == after_review, models.Card.id > after_id)
+            )
+        )
+
+    # Забираем на одну строку больше, чтобы понять, есть ли следующая страница
+    query = query.order_by(models.Card.next_review, models.Card.id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].next_review, rows[-1].id)
+
+    # Сырые строки сразу в JSON, без ORM-объектов и ReviewCard
+    return json_response(
+        [{"id": row.id, "question": row.question, "answer": row.answer, "deck_id": row.deck_id} for row in rows],
+        next_cursor
+    )
+
 
-    return query.all()
+@router.get("/queue", response_model=list[QueueCard])
+async def get_study_queue(
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str | None = None,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Сегодняшняя очередь занятий: повторения и новые карточки вперемешку, колоды чередуются"""
+    rows = await study_queue_service.page(db, user.id, limit, cursor=cursor)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(study_queue_service.today().isoformat(), rows[-1].position)
+    return json_response(
+        [
+            {"id": row.id, "question": row.question, "answer": row.answer, "deck_id": row.deck_id, "is_new": row.is_new}
+            for row in rows
+        ],
+        next_cursor
+    )
+
+
+@router.post("/queue/rebuild")
+async def rebuild_study_queue(user: CurrentUser = Depends(get_current_user)):
+    """Пересобрать сегодняшнюю очередь (например, после импорта новой колоды)"""
+    await study_queue_service.build(user.id, rebuild=True)
+    return {"message": "Очередь пересобрана"}
+
+
+@router.get("/search", response_model=list[CardSearchHit])
+async def search(
+        q: str = Query(..., min_length=1, max_length=200),
+        deck_id: int | None = None,
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = None,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Полнотекстовый поиск по вопросам и ответам во всех колодах пользователя"""
+    rows = await search_cards(db, user.id, q, limit, cursor=cursor, deck_id=deck_id)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].id)
+    return json_response([row._asdict() for row in rows], next_cursor)
+
+
+@router.post("/review/batch", response_model=list[ReviewResponse])
+async def review_cards_batch(batch: ReviewBatchRequest, user: CurrentUser = Depends(get_current_user)):
+    """Отправить пачку ответов (например, офлайн-сессию) одним запросом"""
+    async def job(db: AsyncSession):
+        results = await apply_reviews(db, batch.reviews, user_id=user.id)
+        deck_ids = (await db.scalars(
+            select(distinct(models.Card.deck_id))
+            .where(models.Card.id.in_({entry.card_id for entry in batch.reviews}))
+        )).all()
+        return results, deck_ids
+
+    results, deck_ids = await write_queue.submit(job)
+    deck_stats_service.invalidate(*deck_ids)
+    await response_cache.bump_decks(*deck_ids)
+    return results
 
 
 @router.post("/{card_id}/review", response_model=ReviewResponse)
-def review_card(card_id: int, review: ReviewRequest, db: Session = Depends(get_db)):
+async def review_card(card_id: int, review: ReviewRequest, user: CurrentUser = Depends(get_current_user)):
     """Отправить ответ по карточке и получить новый интервал"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if not card:
-        raise HTTPException(status_code=404, detail="Карточка не найдена")
-
-    from app.services.srs_service import SRSReview
-    current_review = SRSReview(
-        ease_factor=card.ease_factor,
-        interval=card.interval,
-        repetitions=card.repetitions
-    )
+    async def job(db: AsyncSession):
+        card = await get_owned_card(db, card_id, user)
 
-    new_review = SRSService.calculate_next_review(review.quality, current_review)
+        # Тот же путь, что и у пачки: планировщик колоды (SM-2 или FSRS)
+        entry = ReviewBatchItem(card_id=card_id, quality=review.quality, duration_ms=review.duration_ms)
+        [result] = await apply_reviews(db, [entry], user_id=user.id)
+        return result, card.deck_id
 
-    card.ease_factor = new_review.ease_factor
-    card.interval = new_review.interval
-    card.repetitions = new_review.repetitions
-    card.next_review = new_review.next_review
+    # Сводку колоды сбрасываем после коммита, иначе её могут закэшировать со старыми данными
+    result, deck_id = await write_queue.submit(job)
+    deck_stats_service.invalidate(deck_id)
+    await response_cache.bump_decks(deck_id)
+    return result
 
-    db.commit()
-    db.refresh(card)
 
-    return ReviewResponse(
-        card_id=card.id,
-        new_interval=card.interval,
-        new_repetitions=card.repetitions,
-        new_ease_factor=card.ease_factor,
-        next_review=card.next_review
+@router.get("/deck/{deck_id}", response_model=list[CardResponse])
+async def get_deck_cards(
+        deck_id: int,
+        request: Request,
+        limit: int | None = Query(None, ge=1, le=1000),
+        cursor: str | None = None,
+        fields: str | None = Query(None, description="Поля через запятую, например id,question,answer"),
+        stream: bool = Query(False, description="Отдать карточки потоком NDJSON"),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Получить карточки колоды: все, постранично (limit + cursor) или потоком"""
+    # Выбираем только колонки — без ORM-объектов и валидации CardResponse на каждую строку
+    query = keyset_after(
+        select(*parse_fields(fields, models.Card, CardResponse)).where(models.Card.deck_id == deck_id),
+        models.Card.id,
+        cursor
     )
+    if stream:
+        await get_owned_deck(db, deck_id, user)
+        return StreamingResponse(
+            stream_ndjson(query.limit(limit) if limit is not None else query),
+            media_type=NDJSON_MEDIA_TYPE
+        )
 
+    async def build():
+        await get_owned_deck(db, deck_id, user)
+        rows = (await db.execute(query.limit(limit + 1) if limit is not None else query)).all()
+        return page_response(rows, limit)
 
-@router.get("/deck/{deck_id}", response_model=list[CardResponse])
-def get_deck_cards(deck_id: int, db: Session = Depends(get_db)):
-    """Получить все карточки колоды"""
-    cards = db.query(models.Card).filter(models.Card.deck_id == deck_id).all()
-    return cards
+    return await response_cache.respond(request, user.id, [response_cache.deck_key(deck_id)], build)
 
 
 @router.delete("/{card_id}")
-def delete_card(card_id: int, db: Session = Depends(get_db)):
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
-    if not card:
-        raise HTTPException(status_code=404, detail="Карточка не найдена")
-    db.delete(card)
-    db.commit()
-    return {"message": "Карточка удалена"}
\ No newline at end of file
+async def delete_card(card_id: int, user: CurrentUser = Depends(get_current_user)):
+    async def job(db: AsyncSession):
+        card = await get_owned_card(db, card_id, user)
+        orphans = await media_store.release_cards(db, [card_id])
+        await db.delete(card)
+        add_tombstones(db, user.id, "card", [card_id])
+        return card.deck_id, orphans
+
+    deck_id, orphans = await write_queue.submit(job)
+    deck_stats_service.invalidate(deck_id)
+    await response_cache.bump_decks(deck_id)
+    # Файлы, на которые больше никто не ссылается, удаляем только после коммита
+    await media_store.remove(orphans)
+    return {"message": "Карточка удалена"}
+
+
+@router.delete("/")
+async def delete_cards_bulk(request: CardIdsRequest, user: CurrentUser = Depends(get_current_user)):
+    """Удалить несколько карточек одним запросом (все или ни одной)"""
+    async def job(db: AsyncSession):
+        return await delete_cards(db, user.id, request.card_ids)
+
+    deck_ids, orphans = await write_queue.submit(job)
+    for deck_id in deck_ids:
+        deck_stats_service.invalidate(deck_id)
+    await response_cache.bump_decks(*deck_ids)
+    await media_store.remove(orphans)
+    return {"deleted": len(set(request.card_ids))}
+
+
+@router.post("/move")
+async def move_cards_bulk(request: CardMoveRequest, user: CurrentUser = Depends(get_current_user)):
+    """Перенести карточки в другую колоду с сохранением прогресса"""
+    async def job(db: AsyncSession):
+        await get_owned_deck(db, request.deck_id, user)
+        return await move_cards(db, user.id, request.card_ids, request.deck_id)
+
+    deck_ids = await write_queue.submit(job)
+    for deck_id in deck_ids:
+        deck_stats_service.invalidate(deck_id)
+    await response_cache.bump_decks(*deck_ids)
+    return {"moved": len(set(request.card_ids))}
+
+
+def _media_response(blob_name: str, kind: str, size: int) -> MediaResponse:
+    url = media_store.blob_url(blob_name)
+    return MediaResponse(
+        name=blob_name,
+        kind=kind,
+        size=size,
+        url=url,
+        thumbnail_url=file_service.get_thumbnail_url(url) if kind == "image" else None
+    )
+
+
+@router.post("/{card_id}/media", response_model=MediaResponse)
+async def upload_card_media(
+        card_id: int,
+        file: UploadFile = File(...),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Загрузить изображение или аудио к карточке"""
+    await get_owned_card(db, card_id, user)
+
+    content_type = file.content_type or ""
+    if content_type.startswith("image/"):
+        blob = await file_service.save_image(file)
+    elif content_type.startswith("audio/"):
+        blob = await file_service.save_audio(file)
+    else:
+        raise HTTPException(status_code=400, detail="Файл должен быть изображением или аудио")
+
+    async def job(session: AsyncSession):
+        await get_owned_card(session, card_id, user)
+        await media_store.attach(session, card_id, blob)
+
+    try:
+        await write_queue.submit(job)
+    except BaseException:
+        # Карточку удалили, пока шла загрузка, или запись не удалась: файл никому не нужен
+        await media_store.discard(blob)
+        raise
+    # Файл кладётся только после коммита ссылки на него
+    blob = await file_service.place(blob)
+
+    return _media_response(blob.name, blob.kind, blob.size)
+
+
+@router.get("/{card_id}/media", response_model=list[MediaResponse])
+async def get_card_media(
+        card_id: int,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Получить медиафайлы карточки"""
+    await get_owned_card(db, card_id, user)
+    rows = (await db.execute(
+        select(models.MediaBlob.name, models.MediaBlob.kind, models.MediaBlob.size)
+        .join(models.CardMedia, models.CardMedia.blob_name == models.MediaBlob.name)
+        .where(models.CardMedia.card_id == card_id)
+        .order_by(models.CardMedia.created_at)
+    )).all()
+    return [_media_response(row.name, row.kind, row.size) for row in rows]
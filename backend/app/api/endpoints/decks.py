@@ -1,9 +1,26 @@
-from fastapi import APIRouter,Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter,Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app import models
-from app.schemas.deck import DeckCreate, DeckResponse
+from app.api.deps import CurrentUser, get_current_user, get_owned_deck
+from app.api.pagination import (
+    NDJSON_MEDIA_TYPE, keyset_after, page_response, parse_fields, stream_ndjson
+)
+from app.services.bulk_service import clone_deck
+from app.services.media_store import media_store
+from app.services.narration_service import narration_service
+from app.services.deck_stats_service import deck_stats_service
+from app.services.response_cache import response_cache
+from app.services.review_service import reschedule_deck
+from app.services.sync_service import add_tombstones
+from app.services.write_queue import write_queue
+from app.services.import_export_service import detect_format, export_query, import_cards
+from app.core.config import settings
+from app.schemas.deck import DeckCreate, DeckUpdate, DeckResponse, DeckSummary, NarrationJobResponse
+from app.schemas.card import ImportResult
 from pydantic import BaseModel
 from typing import List
 import datetime
@@ -13,44 +30,201 @@ router = APIRouter(prefix="/decks", tags=["decks"])
 
 
 @router.get("/", response_model=list[DeckResponse])
-def get_decks(db: Session = Depends(get_db)):
-    return db.query(models.Deck).all()
+async def get_decks(
+        request: Request,
+        limit: int | None = Query(None, ge=1, le=1000),
+        cursor: str | None = None,
+        fields: str | None = Query(None, description="Поля через запятую, например id,title"),
+        stream: bool = Query(False, description="Отдать колоды потоком NDJSON"),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Список колод: целиком, постранично (limit + cursor) или потоком"""
+    query = keyset_after(
+        select(*parse_fields(fields, models.Deck, DeckResponse)).where(models.Deck.user_id == user.id),
+        models.Deck.id,
+        cursor
+    )
+    if stream:
+        return StreamingResponse(
+            stream_ndjson(query.limit(limit) if limit is not None else query),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    async def build():
+        rows = (await db.execute(query.limit(limit + 1) if limit is not None else query)).all()
+        return page_response(rows, limit)
+
+    return await response_cache.respond(request, user.id, [response_cache.decks_key(user.id)], build)
+
+@router.get("/summary", response_model=list[DeckSummary])
+async def get_decks_summary(
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Сколько карточек в каждой колоде: всего, новых, в изучении и к повторению"""
+    decks = (await db.execute(
+        select(models.Deck.id, models.Deck.title)
+        .where(models.Deck.user_id == user.id)
+        .order_by(models.Deck.id)
+    )).all()
+    return await deck_stats_service.get_summaries(db, decks)
 
 @router.post("/", response_model=DeckResponse)
-def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
-    db_deck = models.Deck(
-        title=deck.title,
-        description=deck.description,
-        user_id=1
-    )
-    db.add(db_deck)
-    db.commit()
-    db.refresh(db_deck)
+async def create_deck(deck: DeckCreate, user: CurrentUser = Depends(get_current_user)):
+    async def job(db: AsyncSession):
+        db_deck = models.Deck(
+            title=deck.title,
+            description=deck.description,
+            scheduler=deck.scheduler,
+            desired_retention=deck.desired_retention,
+            user_id=user.id
+        )
+        db.add(db_deck)
+        await db.flush()
+        await db.refresh(db_deck)
+        return db_deck
+
+    db_deck = await write_queue.submit(job)
+    await response_cache.bump(response_cache.decks_key(user.id))
     return db_deck
 
 @router.get("/{deck_id}", response_model=DeckResponse)
-def get_deck(deck_id: int, db: Session = Depends(get_db)):
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
-    if not deck:
-        raise HTTPException(status_code=404, detail="Колода не найдена")
-    return deck
+async def get_deck(
+        deck_id: int,
+        request: Request,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    async def build():
+        deck = await get_owned_deck(db, deck_id, user)
+        return Response(DeckResponse.model_validate(deck).model_dump_json(), media_type="application/json")
+
+    return await response_cache.respond(request, user.id, [response_cache.deck_key(deck_id)], build)
 
 @router.put("/{deck_id}", response_model=DeckResponse)
-def update_deck(deck_id: int, deck_update: DeckCreate, db: Session = Depends(get_db)):
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
-    if not deck:
-        raise HTTPException(status_code=404, detail="Колода не найдена")
-    deck.title = deck_update.title
-    deck.description = deck_update.description
-    db.commit()
-    db.refresh(deck)
+async def update_deck(deck_id: int, deck_update: DeckUpdate, user: CurrentUser = Depends(get_current_user)):
+    async def job(db: AsyncSession):
+        deck = await get_owned_deck(db, deck_id, user)
+        before = (deck.scheduler, deck.desired_retention)
+        for field, value in deck_update.model_dump(exclude_unset=True).items():
+            # title обязателен у колоды — явный null его не стирает
+            if value is not None or field == "description":
+                setattr(deck, field, value)
+        rescheduling = (deck.scheduler, deck.desired_retention) != before
+        await db.flush()
+        if rescheduling:
+            # Новый планировщик или его цель — пересчитываем интервалы в той же транзакции
+            await reschedule_deck(db, deck_id)
+        await db.refresh(deck)
+        return deck, rescheduling
+
+    deck, rescheduling = await write_queue.submit(job)
+    if rescheduling:
+        deck_stats_service.invalidate(deck_id)
+    await response_cache.bump(response_cache.deck_key(deck_id), response_cache.decks_key(user.id))
     return deck
 
+@router.post("/{deck_id}/reschedule")
+async def reschedule_deck_cards(
+        deck_id: int,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Пересчитать интервалы всех карточек колоды её планировщиком"""
+    await get_owned_deck(db, deck_id, user)
+    rescheduled = await write_queue.submit(lambda session: reschedule_deck(session, deck_id))
+    deck_stats_service.invalidate(deck_id)
+    await response_cache.bump_decks(deck_id)
+    return {"rescheduled": rescheduled}
+
 @router.delete("/{deck_id}")
-def delete_deck(deck_id: int, db: Session = Depends(get_db)):
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
-    if not deck:
-        raise HTTPException(status_code=404, detail="Колода не найдена")
-    db.delete(deck)
-    db.commit()
-    return {"message": "Колода удалена"}
\ No newline at end of file
+async def delete_deck(deck_id: int, user: CurrentUser = Depends(get_current_user)):
+    async def job(db: AsyncSession):
+        deck = await get_owned_deck(db, deck_id, user)
+        orphans = await media_store.release_cards(
+            db, select(models.Card.id).where(models.Card.deck_id == deck_id)
+        )
+        # Карточки удалит ON DELETE CASCADE (в SQLite — при PRAGMA foreign_keys=ON)
+        await db.delete(deck)
+        add_tombstones(db, user.id, "deck", [deck_id])
+        return orphans
+
+    orphans = await write_queue.submit(job)
+    deck_stats_service.invalidate(deck_id)
+    await response_cache.bump(response_cache.deck_key(deck_id), response_cache.decks_key(user.id))
+    await media_store.remove(orphans)
+    return {"message": "Колода удалена"}
+
+@router.post("/{deck_id}/clone", response_model=DeckResponse)
+async def clone_deck_cards(
+        deck_id: int,
+        title: str | None = Query(None, min_length=1, max_length=100),
+        user: CurrentUser = Depends(get_current_user)
+):
+    """Копия колоды со всеми карточками; прогресс повторения в копии начинается заново"""
+    async def job(db: AsyncSession):
+        source = await get_owned_deck(db, deck_id, user)
+        return await clone_deck(db, source, user.id, title)
+
+    deck = await write_queue.submit(job)
+    await response_cache.bump(response_cache.decks_key(user.id))
+    return deck
+
+@router.post("/{deck_id}/audio", response_model=NarrationJobResponse, status_code=202)
+async def narrate_deck(
+        deck_id: int,
+        language_code: str = "ru-RU",
+        voice_name: str | None = None,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Запустить фоновую озвучку всех карточек колоды"""
+    await get_owned_deck(db, deck_id, user)
+    return narration_service.start(deck_id, language_code, voice_name)
+
+@router.get("/{deck_id}/audio/{job_id}", response_model=NarrationJobResponse)
+async def get_narration_job(
+        deck_id: int,
+        job_id: str,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Прогресс озвучки колоды"""
+    await get_owned_deck(db, deck_id, user)
+    job = narration_service.get(job_id)
+    if not job or job.deck_id != deck_id:
+        raise HTTPException(status_code=404, detail="Задача озвучки не найдена")
+    return job
+
+@router.post("/{deck_id}/import", response_model=ImportResult)
+async def import_deck_cards(
+        deck_id: int,
+        file: UploadFile = File(...),
+        format: str | None = Query(None, description="csv, tsv, anki или jsonl; по умолчанию — по расширению файла"),
+        batch_size: int = Query(settings.IMPORT_BATCH_SIZE, ge=1, le=10000),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Импорт карточек из CSV/TSV (в т.ч. экспорта Anki) или JSONL"""
+    await get_owned_deck(db, deck_id, user)
+    try:
+        return await import_cards(deck_id, file, detect_format(file.filename, format), batch_size)
+    finally:
+        # Часть пачек могла успеть записаться даже при ошибке чтения файла
+        deck_stats_service.invalidate(deck_id)
+        await response_cache.bump_decks(deck_id)
+
+@router.get("/{deck_id}/export")
+async def export_deck_cards(
+        deck_id: int,
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Потоковый экспорт карточек колоды в JSONL"""
+    await get_owned_deck(db, deck_id, user)
+    return StreamingResponse(
+        stream_ndjson(export_query(deck_id)),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="deck-{deck_id}.jsonl"'}
+    )
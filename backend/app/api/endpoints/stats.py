@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.api.deps import CurrentUser, get_current_user
+from app import models
+from app.schemas.stats import DailyStatsResponse
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/daily", response_model=list[DailyStatsResponse])
+async def get_daily_stats(
+        deck_id: int | None = None,
+        days: int = Query(30, ge=1, le=366),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Статистика занятий по дням (из свёртки daily_stats, без чтения журнала ответов)"""
+    stats = models.DailyStats
+    query = (
+        select(
+            stats.day,
+            func.sum(stats.reviews).label("reviews"),
+            func.sum(stats.correct).label("correct"),
+            func.sum(stats.new_cards).label("new_cards"),
+            func.sum(stats.duration_ms).label("duration_ms"),
+        )
+        .where(stats.user_id == user.id, stats.day >= datetime.utcnow().date() - timedelta(days=days - 1))
+        .group_by(stats.day)
+        .order_by(stats.day)
+    )
+    if deck_id is not None:
+        query = query.where(stats.deck_id == deck_id)
+
+    rows = (await db.execute(query)).all()
+    return [
+        DailyStatsResponse(
+            day=row.day,
+            reviews=row.reviews,
+            correct=row.correct,
+            accuracy=row.correct / row.reviews if row.reviews else 0.0,
+            new_cards=row.new_cards,
+            duration_ms=row.duration_ms,
+        )
+        for row in rows
+    ]
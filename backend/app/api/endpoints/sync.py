@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.api.deps import CurrentUser, get_current_user
+from app.services.sync_service import apply_upload, collect_changes
+from app.services.write_queue import write_queue
+from app.services.media_store import media_store
+from app.services.deck_stats_service import deck_stats_service
+from app.services.response_cache import response_cache
+from app.schemas.sync import SyncChanges, SyncUpload, SyncUploadResult
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncChanges)
+async def get_changes(
+        since: str | None = Query(None, description="Курсор из прошлого ответа; без него — полная выгрузка"),
+        limit: int = Query(500, ge=1, le=5000),
+        user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Колоды и карточки, созданные, изменённые или удалённые после курсора"""
+    return await collect_changes(db, user.id, since, limit)
+
+
+@router.post("", response_model=SyncUploadResult)
+async def upload_changes(upload: SyncUpload, user: CurrentUser = Depends(get_current_user)):
+    """Загрузить накопленные офлайн-правки и ответы одной транзакцией"""
+    async def job(db: AsyncSession):
+        return await apply_upload(db, user.id, upload)
+
+    result, deck_ids, orphans = await write_queue.submit(job)
+    deck_stats_service.invalidate(*deck_ids)
+    await response_cache.bump_decks(*deck_ids)
+    await media_store.remove(orphans)
+    return result
@@ -1,35 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app import models
+from app.services.password_service import password_hasher
+from app.services.write_queue import write_queue
+from app.api.deps import CurrentUser, get_current_user
 from app.schemas.user import UserCreate, UserResponse
 
 router = APIRouter()
 
 @router.post("/", response_model=UserResponse)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Создание нового пользователя"""
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
     # Проверка username
-    if db.query(models.User).filter(models.User.username == user.username).first():
+    if await db.scalar(select(models.User).where(models.User.username == user.username)):
         raise HTTPException(status_code=400, detail="Имя пользователя занято")
 
-    # 🔹 ХЭШИРОВАНИЕ ПАРОЛЯ
-    hashed_password = get_password_hash(user.password)
+    # 🔹 ХЭШИРОВАНИЕ ПАРОЛЯ (bcrypt нагружает CPU — считаем в отдельном пуле процессов)
+    hashed_password = await password_hasher.hash(user.password)
 
-    db_user = models.User(email=user.email, username=user.username,hashed_password=hashed_password  )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    async def job(session: AsyncSession):
+        db_user = models.User(email=user.email, username=user.username, hashed_password=hashed_password)
+        session.add(db_user)
+        await session.flush()
+        await session.refresh(db_user)
+        return db_user
+
+    try:
+        return await write_queue.submit(job)
+    except IntegrityError:
+        # Тот же email или username параллельно зарегистрировал другой запрос
+        raise HTTPException(status_code=400, detail="Email или имя пользователя уже заняты")
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(user: CurrentUser = Depends(get_current_user)):
+    """Текущий пользователь (из кэша токенов, без запроса к БД)"""
+    return user
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Получение пользователя по ID"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+async def get_user(user_id: int, user: CurrentUser = Depends(get_current_user)):
+    """Получение пользователя по ID (доступен только свой профиль)"""
+    if user_id != user.id:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     return user
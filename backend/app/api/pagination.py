@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from app.database import AsyncSessionLocal
+
+# Заголовок, в котором клиент получает курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(*values) -> str:
+    """Упаковывает значения ключа последней строки в непрозрачный курсор"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Распаковывает курсор и приводит значения к ожидаемым типам"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("wrong cursor length")
+        return [
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for type_, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def keyset_after(query, id_column, cursor: str | None):
+    """Сортировка по id и продолжение строго после курсора"""
+    if cursor is not None:
+        (after_id,) = decode_cursor(cursor, int)
+        query = query.where(id_column > after_id)
+    return query.order_by(id_column)
+
+
+def parse_fields(fields: str | None, model, schema) -> list:
+    """Колонки для fields=id,question,...; id нужен всегда — по нему строится курсор"""
+    if fields is None:
+        return [getattr(model, name) for name in schema.model_fields]
+    requested = ["id"] + [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+    return [getattr(model, name) for name in dict.fromkeys(requested)]
+
+
+def rows_to_dicts(rows: list) -> list[dict]:
+    """Строки результата как словари; даты orjson пишет сам в ISO 8601, как isoformat()"""
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(content, next_cursor: str | None = None) -> ORJSONResponse:
+    """
+    JSON через orjson без response_model: данные уже из БД, повторная проверка Pydantic
+    и jsonable_encoder на тысячах строк стоят дороже самого запроса
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor is not None else None
+    return ORJSONResponse(content, headers=headers)
+
+
+def page_response(rows: list, limit: int | None) -> ORJSONResponse:
+    """Страница строк без ORM-объектов и Pydantic-моделей; курсор — в заголовке"""
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return json_response(rows_to_dicts(rows), next_cursor)
+
+
+async def stream_ndjson(query, chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    """Отдаёт результат запроса построчно в NDJSON, читая его из БД кусками"""
+    # Своя сессия: поток ответа живёт дольше обработчика запроса
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows_to_dicts(rows))
@@ -10,11 +10,33 @@ class Settings:
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./flashlearn.db")
+    # Пул соединений (используется только для серверных БД, не для SQLite)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # секунды
+
+    # SQLite production-профиль: WAL, прагмы и единственный писатель
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # байты
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # < 0 — в КиБ (64 МиБ)
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # мс
+    SQLITE_WRITE_QUEUE: bool = os.getenv("SQLITE_WRITE_QUEUE", "True").lower() == "true"
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+    # Схема — через Alembic (alembic upgrade head); True применяет миграции при старте воркера
+    DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "False").lower() == "true"
+    READY_TIMEOUT: float = float(os.getenv("READY_TIMEOUT", "2"))  # секунды на проверку БД в /ready
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "fallback-secret-key-for-development")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 часа
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # стоимость bcrypt (2^rounds итераций)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))  # больше ожидающих — 429
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "300"))  # секунды; не дольше срока токена и столько же видны изменения пользователя
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
 
     # CORS - полный доступ для Flutter и мобильных приложений
     ALLOWED_ORIGINS: List[str] = ["*"]  # Разрешить все origins для Flutter
@@ -23,6 +45,53 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")  # Доступ с любого интерфейса
     PORT: int = int(os.getenv("PORT", "8000"))
 
+    # Media uploads
+    MAX_IMAGE_SIZE: int = int(os.getenv("MAX_IMAGE_SIZE", str(10 * 1024 * 1024)))  # байты
+    MAX_AUDIO_SIZE: int = int(os.getenv("MAX_AUDIO_SIZE", str(20 * 1024 * 1024)))  # байты
+    THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", "2"))  # процессы для миниатюр
+
+    # Bulk import
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "100"))  # сколько ошибок строк вернуть клиенту
+
+    # Deck summary
+    DECK_SUMMARY_TTL: float = float(os.getenv("DECK_SUMMARY_TTL", "30"))  # секунды
+
+    # Review analytics (свёртка review_logs в daily_stats)
+    ROLLUP_INTERVAL: float = float(os.getenv("ROLLUP_INTERVAL", "60"))  # секунды между прогонами
+    ROLLUP_BATCH_SIZE: int = int(os.getenv("ROLLUP_BATCH_SIZE", "5000"))  # записей журнала за транзакцию
+    ROLLUP_LAG: float = float(os.getenv("ROLLUP_LAG", "5"))  # секунды
+
+    # Study queue (дневная очередь занятий)
+    STUDY_DAILY_LIMIT: int = int(os.getenv("STUDY_DAILY_LIMIT", "200"))  # карточек в очереди на день
+    STUDY_NEW_RATIO: float = float(os.getenv("STUDY_NEW_RATIO", "0.2"))  # доля новых карточек в очереди
+    SRS_FUZZ: bool = os.getenv("SRS_FUZZ", "True").lower() == "true"  # разброс интервалов против пиков нагрузки
+
+    # Delta sync: изменения моложе лага отдаются следующим запросом
+    SYNC_LAG: float = float(os.getenv("SYNC_LAG", "1"))  # секунды
+
+    # Response cache (ETag / If-None-Match для чтения колод и карточек)
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # тел ответов в LRU
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # секунды
+    RESPONSE_CACHE_MAX_BODY: int = int(os.getenv("RESPONSE_CACHE_MAX_BODY", str(1024 * 1024)))  # байты
+    RESPONSE_CACHE_VERSIONS: int = int(os.getenv("RESPONSE_CACHE_VERSIONS", "100000"))  # счётчиков версий в памяти
+    REDIS_URL: str = os.getenv("REDIS_URL", "")  # общий кэш для нескольких воркеров, например redis://localhost:6379/0
+    # Число воркеров uvicorn/gunicorn: без REDIS_URL кэш ответов работает только с одним
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Metrics and profiling
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "False").lower() == "true"  # заголовок Server-Timing со временем SQL
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"  # X-Profile: 1 отдаёт профиль запроса
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", "0.001"))  # секунды между сэмплами
+
+    # Text-to-speech
+    TTS_CACHE_INDEX: str = os.getenv("TTS_CACHE_INDEX", "uploads/tts_cache.json")
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # байты
+    TTS_MAX_CONCURRENCY: int = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))  # одновременных синтезов
+    TTS_FALLBACK_LATENCY_MS: int = int(os.getenv("TTS_FALLBACK_LATENCY_MS", "0"))  # имитация задержки для нагрузочных тестов
+    NARRATION_CONCURRENCY: int = int(os.getenv("NARRATION_CONCURRENCY", "4"))  # карточек параллельно на задачу
+    NARRATION_CHUNK_SIZE: int = int(os.getenv("NARRATION_CHUNK_SIZE", "100"))
+
     # API settings
     API_V1_PREFIX: str = "/api/v1"
 
@@ -31,9 +100,12 @@ class Settings:
 
     @property
     def database_url(self) -> str:
-        """Get database URL with async support for SQLite"""
+        """Get database URL with async support for SQLite and PostgreSQL"""
         if self.DATABASE_URL.startswith("sqlite"):
             return self.DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
+        for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+            if self.DATABASE_URL.startswith(prefix):
+                return "postgresql+asyncpg://" + self.DATABASE_URL[len(prefix):]
         return self.DATABASE_URL
 
 
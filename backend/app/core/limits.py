@@ -0,0 +1,61 @@
+import re
+from fastapi import HTTPException
+from starlette.responses import PlainTextResponse
+
+# Запас на заголовки частей multipart и остальные поля формы
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI-middleware: ограничивает размер тела запроса до того, как Starlette
+    разберёт multipart и сложит файл во временный SpooledTemporaryFile.
+
+    limits — регулярное выражение пути -> лимит в байтах. Запрос с большим
+    Content-Length отклоняется сразу, без него — как только тело превысит лимит.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = [(re.compile(pattern), limit) for pattern, limit in limits.items()]
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit_for(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = _header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = PlainTextResponse("Файл слишком большой", status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI пробрасывает HTTPException из разбора тела как есть
+                    raise HTTPException(status_code=413, detail="Файл слишком большой")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _limit_for(self, scope) -> int | None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            return None
+        for pattern, limit in self.limits:
+            if pattern.fullmatch(scope["path"]):
+                return limit
+        return None
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
@@ -0,0 +1,333 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Границы корзин гистограмм
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class _Metric:
+    """Метрика с метками; значения хранятся по кортежу значений меток"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Наблюдения приходят и из пулов потоков (TTS), поэтому под блокировкой
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _labels(self, labelvalues: tuple) -> str:
+        if not labelvalues:
+            return ""
+        pairs = ",".join(
+            f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labelvalues)
+        )
+        return "{" + pairs + "}"
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{self._labels(labelvalues)} {_format(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                # Счётчики по корзинам (последняя — +Inf), сумма и количество
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((labelvalues, (list(counts), total, count)) for labelvalues, (counts, total, count)
+                           in self._values.items())
+        for labelvalues, (counts, total, count) in items:
+            labels = self._labels(labelvalues)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format(bound)}"'
+                bucket_labels = labels[:-1] + "," + le + "}" if labels else "{" + le + "}"
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Collected(_Metric):
+    """Метрика, значения которой читаются функцией collect в момент выгрузки /metrics"""
+
+    def __init__(self, name: str, documentation: str, kind: str, collect, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        # collect() -> {значения меток: число}
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        with self._lock:
+            self._values = dict(self._collect())
+        return super().render()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "flashlearn_http_requests_total", "HTTP-запросы по маршруту и статусу", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "flashlearn_http_request_duration_seconds", "Время обработки запроса", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "flashlearn_http_requests_in_flight", "Запросы в обработке прямо сейчас", ("method", "route")
+))
+db_queries_per_request = registry.register(Histogram(
+    "flashlearn_db_queries_per_request", "SQL-запросов на один HTTP-запрос (N+1 видно по хвосту)",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+))
+db_time_per_request = registry.register(Histogram(
+    "flashlearn_db_time_per_request_seconds", "Суммарное время SQL за HTTP-запрос", ("method", "route")
+))
+db_query_latency = registry.register(Histogram(
+    "flashlearn_db_query_duration_seconds", "Время одного SQL-запроса"
+))
+operation_latency = registry.register(Histogram(
+    "flashlearn_operation_duration_seconds", "Время горячих операций (миниатюры, TTS, SRS)", ("operation",)
+))
+
+
+@dataclass
+class RequestStats:
+    """SQL-нагрузка текущего HTTP-запроса"""
+    queries: int = 0
+    db_time: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+@contextmanager
+def attribute_to(stats: RequestStats | None):
+    """Засчитывает запросы внутри блока указанному HTTP-запросу (например, в очереди записей)"""
+    token = _request_stats.set(stats)
+    try:
+        yield
+    finally:
+        _request_stats.reset(token)
+
+
+def instrument_engine(engine):
+    """Считает и замеряет SQL-запросы движка (для async-движка передаётся sync_engine)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish_query(conn)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            _finish_query(context.connection)
+
+
+def _finish_query(conn):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    db_query_latency.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def timed(operation: str):
+    """Декоратор: время вызова попадает в flashlearn_operation_duration_seconds"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    operation_latency.observe(time.perf_counter() - started, operation)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                operation_latency.observe(time.perf_counter() - started, operation)
+        return wrapper
+    return decorator
+
+
+def route_template(scope) -> str:
+    """Шаблон маршрута (/api/v1/cards/{card_id}), а не сырой путь — иначе метки не ограничены"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: задержка, запросы в обработке и число SQL-запросов по маршрутам.
+
+    С server_timing в ответ добавляется заголовок Server-Timing со временем SQL —
+    его показывают DevTools браузера. С profiling запрос с заголовком X-Profile: 1
+    вместо ответа возвращает сэмплированный профиль (см. app.core.profiling).
+    """
+
+    def __init__(self, app, server_timing: bool = False, profiling: bool = False, profiling_interval: float = 0.001):
+        self.app = app
+        self.server_timing = server_timing
+        self.profiling = profiling
+        self.profiling_interval = profiling_interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.profiling and _header(scope, b"x-profile") == b"1":
+            await self._profile(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        stats = RequestStats()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    timing = f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        http_in_flight.inc(method, route)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            http_in_flight.dec(method, route)
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            db_queries_per_request.observe(stats.queries, method, route)
+            db_time_per_request.observe(stats.db_time, method, route)
+
+    async def _profile(self, scope, receive, send):
+        from app.core.profiling import SamplingProfiler
+
+        async def discard(message):
+            pass
+
+        stats = RequestStats()
+        with attribute_to(stats), SamplingProfiler(self.profiling_interval) as profiler:
+            await self.app(scope, receive, discard)
+
+        header = f"# {profiler.samples} samples, {profiler.elapsed:.3f}s, {stats.queries} SQL queries, " \
+                 f"{stats.db_time * 1000:.1f}ms in SQL\n"
+        body = (header + profiler.render()).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope, name: bytes) -> bytes | None:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
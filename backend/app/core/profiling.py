@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профайлер потока event loop на sys._current_frames.
+
+    Фоновый поток раз в interval снимает стек потока, в котором профайлер
+    запущен, и копит одинаковые стеки. Результат — «свёрнутые» стеки
+    (формат flamegraph.pl / speedscope). Снимается весь поток, поэтому
+    параллельные запросы того же воркера тоже попадут в профиль.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target: int | None = None
+        self._started = 0.0
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def render(self, limit: int = 200) -> str:
+        """Самые частые стеки: «кадр;кадр;кадр число_сэмплов»"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common(limit))
@@ -4,7 +4,14 @@ from datetime import datetime, timedelta
 from app.core.config import settings
 
 # 🔐 Хэширование паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max_rounds = rounds: хэш с другой стоимостью считается устаревшим и пересчитывается при входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 # 🔑 JWT настройки
 SECRET_KEY = settings.SECRET_KEY
@@ -19,7 +26,11 @@ def get_password_hash(password: str) -> str:
     """Получить хеш пароля"""
     return pwd_context.hash(password)
 
-def create_access_token( dict, expires_delta: timedelta = None) -> str:
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Проверить пароль и, если хеш устарел (другая стоимость bcrypt), вернуть новый"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Создать JWT-токен"""
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
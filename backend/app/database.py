@@ -1,24 +1,88 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+
+def _engine_options(url: str) -> dict:
+    """Параметры движка: для SQLite — без пула, для серверных БД — настроенный пул"""
+    # Специальные настройки для SQLite
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+# Синхронный движок: создание схемы и служебные скрипты
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+# Асинхронный движок для обработчиков запросов
+async_engine = create_async_engine(settings.database_url, **_engine_options(settings.database_url))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Прагмы SQLite на каждое новое соединение: WAL, кэш, mmap, ожидание блокировки и внешние ключи"""
+    cursor = dbapi_connection.cursor()
+    # Без неё SQLite не проверяет внешние ключи и не выполняет ON DELETE CASCADE
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
 
-# Специальные настройки для SQLite
 if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        settings.DATABASE_URL, 
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(settings.DATABASE_URL)
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+# Число и время SQL-запросов для /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+def upsert(db: AsyncSession, table):
+    """INSERT ... ON CONFLICT в диалекте текущей БД"""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+def upgrade_schema():
+    """Применяет миграции Alembic до последней версии (alembic upgrade head)"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    # Не перенастраивать логирование приложения из alembic.ini
+    config.attributes["configure_logging"] = False
+    # База, созданная create_all до перехода на Alembic, уже содержит схему ревизии 0001
+    tables = inspect(engine).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
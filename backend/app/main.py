@@ -1,15 +1,53 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
-from app.database import engine, Base
-from app import models
-from app.api.endpoints import users, decks, cards, auth 
+from app.core.limits import MULTIPART_OVERHEAD, BodySizeLimitMiddleware
+from app.core.metrics import MetricsMiddleware, registry
+from sqlalchemy import text
+from app.database import async_engine, upgrade_schema
+from app.api.endpoints import users, decks, cards, auth, stats, sync
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.services.analytics_service import analytics_service
+from app.services.file_service import file_service
+from app.services.media_store import media_store
+from app.services.narration_service import narration_service
+from app.services.password_service import password_hasher
+from app.services.response_cache import response_cache
+from app.services.tts_executor import tts_executor
+from app.services.write_queue import write_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка воркера: всё тяжёлое — здесь, а не при импорте модулей"""
+    if settings.DB_AUTO_MIGRATE:
+        # Схемой управляет Alembic; автоприменение — для разработки с одним процессом
+        await run_in_threadpool(upgrade_schema)
+    analytics_service.start()
+    print("✅ Все роутеры подключены! Сервер запущен.")
+    yield
+    # Сначала то, что ещё пишет в БД через очередь, потом сама очередь и пулы
+    await narration_service.close()
+    await analytics_service.close()
+    await write_queue.close()
+    file_service.close()
+    tts_executor.close()
+    password_hasher.close()
+    await response_cache.close()
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title="FlashLearn API",
     description="Backend для системы интервального повторения с Flutter фронтендом",
-    version="0.2.0"
+    version="0.2.0",
+    lifespan=lifespan
 )
 
 # CORS для Flutter
@@ -19,15 +57,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
+)
+
+# Размер загрузки медиа проверяется до того, как Starlette сложит файл во временный
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        r"/api/v1/cards/\d+/media": max(settings.MAX_IMAGE_SIZE, settings.MAX_AUDIO_SIZE) + MULTIPART_OVERHEAD,
+    },
+)
+
+# Метрики по маршрутам (последним — значит, снаружи и меряет весь запрос)
+app.add_middleware(
+    MetricsMiddleware,
+    server_timing=settings.SERVER_TIMING,
+    profiling=settings.PROFILING_ENABLED,
+    profiling_interval=settings.PROFILING_INTERVAL,
 )
 
 settings.API_V1_PREFIX = "/api/v1"
-Base.metadata.create_all(bind=engine)
+
+# Медиафайлы из контентно-адресуемого хранилища (URL стабильны и не меняются).
+# Наружу отдаются только блобы и каталоги старых загрузок: индекс кэша TTS
+# и недокачанные файлы из uploads/tmp лежат рядом и публичными быть не должны
+app.mount("/uploads/blobs", StaticFiles(directory=media_store.blobs_dir, check_dir=False), name="uploads")
+for legacy_dir in ("images", "audio"):
+    app.mount(
+        f"/uploads/{legacy_dir}",
+        StaticFiles(directory=os.path.join(media_store.root, legacy_dir), check_dir=False),
+        name=f"uploads_{legacy_dir}"
+    )
 
 app.include_router(auth.router, prefix="/api/v1", tags=["Auth"])  # 🔹 Добавить
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(decks.router, prefix=settings.API_V1_PREFIX, tags=["decks"])
 app.include_router(cards.router, prefix=settings.API_V1_PREFIX, tags=["cards"])
+app.include_router(stats.router, prefix=settings.API_V1_PREFIX, tags=["stats"])
+app.include_router(sync.router, prefix=settings.API_V1_PREFIX, tags=["sync"])
 
 
 @app.get("/")
@@ -37,13 +104,32 @@ async def root(request: Request):
         "message": "🚀 FlashLearn API с Flutter фронтендом работает!",
         "docs_url": f"{base_url}docs",
         "redoc_url": f"{base_url}redoc",
-        "health_check": f"{base_url}health"
+        "health_check": f"{base_url}health",
+        "readiness_check": f"{base_url}ready"
     }
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "debug": settings.DEBUG}
 
+@app.get("/ready")
+async def readiness_check():
+    """Готовность принимать трафик: БД отвечает на запрос"""
+    try:
+        async with asyncio.timeout(settings.READY_TIMEOUT):
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        # Подробности — только в лог: текст ошибки драйвера может раскрыть адрес и имя БД
+        print(f"Предупреждение: проверка готовности не прошла: {type(e).__name__}: {e}")
+        return JSONResponse(status_code=503, content={"status": "unavailable", "database": "unavailable"})
+    return {"status": "ready", "database": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -52,5 +138,3 @@ if __name__ == "__main__":
         port=settings.PORT,
         reload=settings.DEBUG
     )
-
-print("✅ Все роутеры подключены! Сервер запущен.")
\ No newline at end of file
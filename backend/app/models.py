@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Boolean, Column, Integer, String, Date, DateTime, Text, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from datetime import datetime
 from app.database import Base
@@ -19,10 +19,17 @@ class User(Base):
 
 class Deck(Base):
     __tablename__ = "decks"
+    __table_args__ = (
+        # Дельта-синхронизация: изменения колод пользователя после курсора
+        Index("ix_decks_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     description = Column(Text, default="")
+    # Планировщик повторений колоды: "sm2" или "fsrs" (см. app/services/schedulers.py)
+    scheduler = Column(String(20), default="sm2", server_default="sm2", nullable=False)
+    desired_retention = Column(Float, default=0.9, server_default="0.9", nullable=False)  # цель FSRS
     user_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -35,6 +42,12 @@ class Deck(Base):
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # Очередь повторения по колоде: диапазонный скан вместо полного прохода по таблице
+        Index("ix_cards_deck_id_next_review", "deck_id", "next_review"),
+        # Дельта-синхронизация: изменённые карточки по updated_at
+        Index("ix_cards_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question = Column(Text, nullable=False)
@@ -48,6 +61,125 @@ class Card(Base):
     ease_factor = Column(Float, default=2.5)
     interval = Column(Integer, default=0)
     repetitions = Column(Integer, default=0)
-    next_review = Column(DateTime, default=func.now())
+    next_review = Column(DateTime, default=func.now(), index=True)
+    # Состояние FSRS: пусто, пока карточку не вёл FSRS
+    stability = Column(Float, nullable=True)
+    difficulty = Column(Float, nullable=True)
+    last_review = Column(DateTime, nullable=True)
+    # Заранее синтезированная озвучка (см. POST /decks/{deck_id}/audio)
+    question_audio_url = Column(String(255), nullable=True)
+    answer_audio_url = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class MediaBlob(Base):
+    """Уникальный медиафайл в контентно-адресуемом хранилище"""
+    __tablename__ = "media_blobs"
+
+    name = Column(String(80), primary_key=True)  # "<sha256>.<расширение>"
+    kind = Column(String(16), nullable=False)  # image / audio
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CardMedia(Base):
+    """Ссылка карточки на медиафайл"""
+    __tablename__ = "card_media"
+
+    card_id = Column(
+        Integer,
+        ForeignKey("cards.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    blob_name = Column(
+        String(80),
+        ForeignKey("media_blobs.name"),
+        primary_key=True,
+        index=True
+    )
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ReviewLog(Base):
+    """
+    Журнал ответов: одна строка на каждый ответ, только добавление.
+
+    card_id и deck_id — без внешних ключей: история должна пережить удаление карточки.
+    """
+    __tablename__ = "review_logs"
+    __table_args__ = (
+        Index("ix_review_logs_user_id_reviewed_at", "user_id", "reviewed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    card_id = Column(Integer, nullable=False, index=True)
+    deck_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    quality = Column(Integer, nullable=False)
+    duration_ms = Column(Integer, nullable=True)  # время на ответ, если его прислал клиент
+    scheduler = Column(String(20), nullable=False)
+    elapsed_days = Column(Float, nullable=False)  # сколько прошло с прошлого показа
+    # Состояние до ответа
+    prev_ease_factor = Column(Float, nullable=False)
+    prev_interval = Column(Integer, nullable=False)
+    prev_repetitions = Column(Integer, nullable=False)
+    prev_stability = Column(Float, nullable=True)
+    prev_difficulty = Column(Float, nullable=True)
+    # Состояние после ответа
+    ease_factor = Column(Float, nullable=False)
+    interval = Column(Integer, nullable=False)
+    repetitions = Column(Integer, nullable=False)
+    stability = Column(Float, nullable=True)
+    difficulty = Column(Float, nullable=True)
+    reviewed_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+
+
+class DailyStats(Base):
+    """Дневные итоги по пользователю и колоде (свёртка review_logs)"""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    deck_id = Column(Integer, primary_key=True)
+    reviews = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)  # ответы с оценкой 3 и выше
+    new_cards = Column(Integer, default=0, nullable=False)  # первые показы карточек
+    duration_ms = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class RollupWatermark(Base):
+    """До какой записи журнала уже досчитана свёртка"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class Tombstone(Base):
+    """Запись об удалении: чтобы удаление дошло до офлайн-клиентов через /sync"""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(10), nullable=False)  # card / deck
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StudyQueueItem(Base):
+    """Дневная очередь занятий: какие карточки и в каком порядке показать пользователю сегодня"""
+    __tablename__ = "study_queue"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    card_id = Column(Integer, nullable=False)  # без FK: удалённые карточки просто пропускаются при чтении
+    is_new = Column(Boolean, default=False, nullable=False)
@@ -1,3 +1,6 @@
 from .user import UserBase, UserCreate, UserResponse
-from .deck import DeckBase, DeckCreate, DeckResponse
-from .card import CardBase, CardCreate, CardResponse, ReviewRequest, ReviewResponse, ReviewCard
+from .deck import DeckBase, DeckCreate, DeckUpdate, DeckResponse, DeckSummary, NarrationJobResponse
+from .card import CardBase, CardCreate, CardResponse, ReviewRequest, ReviewResponse, ReviewCard, ReviewBatchItem, ReviewBatchRequest, ImportResult, ImportRowError, CardSearchHit, QueueCard, CardIdsRequest, CardMoveRequest
+from .media import MediaResponse
+from .stats import DailyStatsResponse
+from .sync import SyncChanges, SyncUpload, SyncUploadResult
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -16,6 +16,11 @@ class CardResponse(CardBase):
     interval: int
     repetitions: int
     next_review: datetime
+    stability: Optional[float] = None
+    difficulty: Optional[float] = None
+    last_review: Optional[datetime] = None
+    question_audio_url: Optional[str] = None
+    answer_audio_url: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -28,7 +33,17 @@ class CardUpdate(BaseModel):
 
 
 class ReviewRequest(BaseModel):
-    quality: int  # 0-5
+    quality: int = Field(ge=0, le=5)
+    duration_ms: Optional[int] = Field(None, ge=0)  # время на ответ, мс
+
+class ReviewBatchItem(BaseModel):
+    card_id: int
+    quality: int = Field(ge=0, le=5)
+    answered_at: Optional[datetime] = None  # время ответа на клиенте (для офлайн-синхронизации)
+    duration_ms: Optional[int] = Field(None, ge=0)
+
+class ReviewBatchRequest(BaseModel):
+    reviews: list[ReviewBatchItem] = Field(min_length=1, max_length=1000)
 
 class ReviewResponse(BaseModel):
     card_id: int
@@ -45,3 +60,38 @@ class ReviewCard(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class CardIdsRequest(BaseModel):
+    card_ids: list[int] = Field(min_length=1, max_length=1000)
+
+class CardMoveRequest(CardIdsRequest):
+    deck_id: int  # колода, в которую переносятся карточки
+
+
+class QueueCard(ReviewCard):
+    is_new: bool  # новая карточка, ещё без ответов
+
+
+class ImportRowError(BaseModel):
+    row: int  # номер строки в файле
+    detail: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+    errors_truncated: bool = False  # ошибок больше, чем IMPORT_MAX_ERRORS
+    # Файл не дочитан (например, битая кодировка): imported — сколько карточек уже записано
+    aborted: str | None = None
+
+
+class CardSearchHit(BaseModel):
+    id: int
+    deck_id: int
+    question: str
+    answer: str
+    rank: float  # меньше — релевантнее
+
+    class Config:
+        from_attributes = True
@@ -1,14 +1,23 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
 class DeckBase(BaseModel):
     title: str
     description: Optional[str] = None
+    scheduler: str = Field("sm2", pattern="^(sm2|fsrs)$")
+    desired_retention: float = Field(0.9, ge=0.7, le=0.99)
 
 class DeckCreate(DeckBase):
     pass
 
+class DeckUpdate(BaseModel):
+    # Частичное обновление: непереданные поля (в т.ч. планировщик) не меняются
+    title: Optional[str] = None
+    description: Optional[str] = None
+    scheduler: Optional[str] = Field(None, pattern="^(sm2|fsrs)$")
+    desired_retention: Optional[float] = Field(None, ge=0.7, le=0.99)
+
 class DeckResponse(DeckBase):
     id: int
     user_id: int
@@ -17,3 +26,28 @@ class DeckResponse(DeckBase):
     
     class Config:
         from_attributes = True
+
+class DeckSummary(BaseModel):
+    deck_id: int
+    title: str
+    total: int      # всего карточек
+    new: int        # ещё ни разу не повторялись
+    learning: int   # в изучении (интервал меньше 21 дня)
+    due: int        # пора повторить
+
+class NarrationJobResponse(BaseModel):
+    id: str
+    deck_id: int
+    language_code: str
+    voice_name: Optional[str] = None
+    status: str
+    total: int
+    skipped: int
+    done: int
+    failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
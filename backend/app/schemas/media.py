@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class MediaResponse(BaseModel):
+    name: str
+    kind: str
+    size: int
+    url: str
+    thumbnail_url: Optional[str] = None
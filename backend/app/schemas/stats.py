@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from datetime import date
+
+class DailyStatsResponse(BaseModel):
+    day: date
+    reviews: int
+    correct: int
+    accuracy: float     # доля ответов с оценкой 3 и выше
+    new_cards: int
+    duration_ms: int    # время занятий по данным клиента
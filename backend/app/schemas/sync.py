@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+from .card import CardResponse, ReviewBatchItem, ReviewResponse
+from .deck import DeckResponse
+
+class SyncChanges(BaseModel):
+    decks: list[DeckResponse]
+    cards: list[CardResponse]
+    deleted_decks: list[int]
+    deleted_cards: list[int]
+    cursor: str         # передать как since в следующий GET /sync
+    has_more: bool      # изменений больше limit — сразу запросить ещё
+
+class SyncCardCreate(BaseModel):
+    client_id: str      # локальный id карточки на клиенте
+    deck_id: int
+    question: str
+    answer: str
+
+class SyncCardUpdate(BaseModel):
+    id: int
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    base_updated_at: datetime   # updated_at карточки, которую редактировал клиент
+
+class SyncUpload(BaseModel):
+    created_cards: list[SyncCardCreate] = Field(default_factory=list, max_length=1000)
+    updated_cards: list[SyncCardUpdate] = Field(default_factory=list, max_length=1000)
+    deleted_cards: list[int] = Field(default_factory=list, max_length=1000)
+    reviews: list[ReviewBatchItem] = Field(default_factory=list, max_length=1000)
+
+class SyncCreated(BaseModel):
+    client_id: str
+    id: int
+
+class SyncUploadResult(BaseModel):
+    created: list[SyncCreated]
+    reviews: list[ReviewResponse]
+    conflicts: list[int]    # карточки изменились на сервере после base_updated_at — правка не применена
+    missing: list[int]      # карточки или колоды не найдены (например, уже удалены)
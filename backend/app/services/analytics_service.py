@@ -0,0 +1,146 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.core.config import settings
+from app.database import upsert
+from app.services.write_queue import write_queue
+
+WATERMARK = "daily_stats"
+
+
+class StaleWatermark(Exception):
+    """Ту же часть журнала уже досчитал другой процесс"""
+
+
+class AnalyticsService:
+    """
+    Инкрементальная свёртка review_logs в daily_stats.
+
+    Водяной знак — id последней учтённой записи журнала. Каждая порция
+    (свёртка + сдвиг знака) — одна транзакция, а знак сдвигается условным
+    UPDATE ... WHERE last_id = старое значение: если параллельный процесс уже
+    обработал эту порцию, транзакция откатывается и счётчики не удваиваются.
+    """
+
+    def __init__(self, batch_size: int, interval: float, lag: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        # Записи моложе начала самой старой открытой транзакции не трогаем: запись
+        # с меньшим id может ещё не закоммититься. lag — запас на расхождение часов
+        self.lag = lag
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Запускает периодическую свёртку в текущем event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def rollup(self) -> int:
+        """Досчитывает всё, что накопилось в журнале; возвращает число учтённых ответов"""
+        total = 0
+        while True:
+            try:
+                processed = await write_queue.submit(self._rollup_batch)
+            except StaleWatermark:
+                return total
+            if not processed:
+                return total
+            total += processed
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception as e:
+                print(f"Предупреждение: свёртка статистики не удалась: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _rollup_batch(self, db: AsyncSession) -> int:
+        await db.execute(
+            upsert(db, models.RollupWatermark)
+            .values(name=WATERMARK, last_id=0, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        last_id = await db.scalar(
+            select(models.RollupWatermark.last_id).where(models.RollupWatermark.name == WATERMARK)
+        )
+
+        bound = datetime.utcnow()
+        oldest_write = await write_queue.oldest_open_write(db)
+        if oldest_write is not None:
+            bound = min(bound, oldest_write)
+        bound -= timedelta(seconds=self.lag)
+
+        log = models.ReviewLog
+        ids = (await db.scalars(
+            select(log.id)
+            .where(log.id > last_id, log.created_at <= bound)
+            .order_by(log.id)
+            .limit(self.batch_size)
+        )).all()
+        if not ids:
+            return 0
+        upper = ids[-1]
+
+        day = func.date(log.reviewed_at)
+        rows = (await db.execute(
+            select(
+                day.label("day"),
+                log.user_id,
+                log.deck_id,
+                func.count().label("reviews"),
+                func.sum(case((log.quality >= 3, 1), else_=0)).label("correct"),
+                func.sum(case((log.prev_interval == 0, 1), else_=0)).label("new_cards"),
+                func.sum(func.coalesce(log.duration_ms, 0)).label("duration_ms"),
+            )
+            .where(log.id > last_id, log.id <= upper)
+            .group_by(day, log.user_id, log.deck_id)
+        )).all()
+
+        now = datetime.utcnow()
+        stats = models.DailyStats.__table__
+        for row in rows:
+            statement = upsert(db, stats).values(
+                day=row.day if isinstance(row.day, date) else date.fromisoformat(row.day),
+                user_id=row.user_id,
+                deck_id=row.deck_id,
+                reviews=row.reviews,
+                correct=row.correct,
+                new_cards=row.new_cards,
+                duration_ms=row.duration_ms,
+                updated_at=now,
+            )
+            await db.execute(statement.on_conflict_do_update(
+                index_elements=["day", "user_id", "deck_id"],
+                set_={
+                    "reviews": stats.c.reviews + statement.excluded.reviews,
+                    "correct": stats.c.correct + statement.excluded.correct,
+                    "new_cards": stats.c.new_cards + statement.excluded.new_cards,
+                    "duration_ms": stats.c.duration_ms + statement.excluded.duration_ms,
+                    "updated_at": now,
+                }
+            ))
+
+        moved = await db.execute(
+            update(models.RollupWatermark)
+            .where(models.RollupWatermark.name == WATERMARK, models.RollupWatermark.last_id == last_id)
+            .values(last_id=upper, updated_at=now)
+        )
+        if moved.rowcount != 1:
+            raise StaleWatermark()
+        return len(ids)
+
+
+analytics_service = AnalyticsService(
+    batch_size=settings.ROLLUP_BATCH_SIZE,
+    interval=settings.ROLLUP_INTERVAL,
+    lag=settings.ROLLUP_LAG
+)
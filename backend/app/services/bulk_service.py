@@ -0,0 +1,136 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.services.media_store import media_store
+from app.services.review_service import reschedule_deck
+from app.services.sync_service import add_tombstones
+
+
+async def _owned_cards(db: AsyncSession, user_id: int, card_ids: list[int]) -> dict[int, int]:
+    """id карточки -> id колоды; 404 со списком, если какие-то карточки не найдены у пользователя"""
+    rows = (await db.execute(
+        select(models.Card.id, models.Card.deck_id)
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Card.id.in_(card_ids), models.Deck.user_id == user_id)
+    )).all()
+    owned = {row.id: row.deck_id for row in rows}
+    missing = [card_id for card_id in card_ids if card_id not in owned]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Карточки не найдены: {missing}")
+    return owned
+
+
+async def delete_cards(db: AsyncSession, user_id: int, card_ids: list[int]) -> tuple[set[int], list[str]]:
+    """
+    Удаляет карточки пользователя одним DELETE (без коммита).
+
+    Возвращает затронутые колоды и блобы без ссылок — их файлы удаляются после коммита.
+    """
+    card_ids = sorted(set(card_ids))
+    owned = await _owned_cards(db, user_id, card_ids)
+    orphans = await media_store.release_cards(db, card_ids)
+    await db.execute(delete(models.Card).where(models.Card.id.in_(card_ids)))
+    add_tombstones(db, user_id, "card", card_ids)
+    return set(owned.values()), orphans
+
+
+async def move_cards(db: AsyncSession, user_id: int, card_ids: list[int], deck_id: int) -> set[int]:
+    """
+    Переносит карточки в другую колоду пользователя одним UPDATE (без коммита).
+
+    Прогресс повторения сохраняется; карточки из колод с другим планировщиком
+    или целью пересчитываются планировщиком целевой колоды.
+    Возвращает затронутые колоды, включая целевую.
+    """
+    card_ids = sorted(set(card_ids))
+    owned = await _owned_cards(db, user_id, card_ids)
+    await db.execute(
+        update(models.Card)
+        .where(models.Card.id.in_(card_ids))
+        .values(deck_id=deck_id, updated_at=datetime.utcnow())
+        # Все строки уже проверены выше — сверять сессию с условием незачем
+        .execution_options(synchronize_session=False)
+    )
+
+    schedulers = {
+        row.id: (row.scheduler, row.desired_retention) for row in (await db.execute(
+            select(models.Deck.id, models.Deck.scheduler, models.Deck.desired_retention)
+            .where(models.Deck.id.in_(set(owned.values()) | {deck_id}))
+        )).all()
+    }
+    foreign = [card_id for card_id in card_ids if schedulers[owned[card_id]] != schedulers[deck_id]]
+    if foreign:
+        await reschedule_deck(db, deck_id, card_ids=foreign)
+    return set(owned.values()) | {deck_id}
+
+
+async def clone_deck(
+        db: AsyncSession,
+        source: models.Deck,
+        user_id: int,
+        title: str | None = None,
+        chunk_size: int = 1000
+) -> models.Deck:
+    """
+    Копия колоды с карточками и медиа (без коммита).
+
+    Карточки копируются кусками по id и начинают изучение с нуля — копию берёт
+    новый ученик. INSERT ... RETURNING отдаёт id копий в порядке вставки, так что
+    ссылки на медиа переносятся по явному соответствию «оригинал -> копия».
+    """
+    now = datetime.utcnow()
+    deck = models.Deck(
+        title=title or source.title,
+        description=source.description,
+        scheduler=source.scheduler,
+        desired_retention=source.desired_retention,
+        user_id=user_id,
+        created_at=now,
+        updated_at=now
+    )
+    db.add(deck)
+    await db.flush()
+
+    last_id = 0
+    while True:
+        rows = (await db.execute(
+            select(
+                models.Card.id,
+                models.Card.question,
+                models.Card.answer,
+                models.Card.question_audio_url,
+                models.Card.answer_audio_url
+            )
+            .where(models.Card.deck_id == source.id, models.Card.id > last_id)
+            .order_by(models.Card.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        copied = (await db.scalars(
+            insert(models.Card).returning(models.Card.id, sort_by_parameter_order=True),
+            [
+                {
+                    "question": row.question,
+                    "answer": row.answer,
+                    "deck_id": deck.id,
+                    "ease_factor": 2.5,
+                    "interval": 0,
+                    "repetitions": 0,
+                    "next_review": now,
+                    "question_audio_url": row.question_audio_url,
+                    "answer_audio_url": row.answer_audio_url,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for row in rows
+            ]
+        )).all()
+        await media_store.copy_card_media(db, dict(zip((row.id for row in rows), copied)))
+
+    await db.refresh(deck)
+    return deck
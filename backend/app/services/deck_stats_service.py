@@ -0,0 +1,65 @@
+from datetime import datetime
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.schemas.deck import DeckSummary
+
+# Интервал (в днях), начиная с которого карточка считается выученной, а не изучаемой
+MATURE_INTERVAL = 21
+
+
+class DeckStatsService:
+    """
+    Счётчики карточек по колодам для главного экрана.
+
+    Счётчик due зависит от текущего времени и меняется без всяких записей в БД,
+    поэтому вместо материализованных счётчиков — один агрегирующий запрос по
+    (deck_id, next_review) и короткий TTL-кэш, который сбрасывается при изменении карточек.
+    """
+
+    def __init__(self, ttl: float):
+        self._cache = TTLCache(ttl=ttl)
+
+    async def get_summaries(self, db: AsyncSession, decks: list) -> list[DeckSummary]:
+        """Сводка по колодам: из кэша, а недостающие — одним GROUP BY"""
+        counts = {deck.id: self._cache.get(deck.id) for deck in decks}
+        missing = [deck_id for deck_id, value in counts.items() if value is None]
+        if missing:
+            fresh = await self._count(db, missing)
+            for deck_id in missing:
+                counts[deck_id] = fresh.get(deck_id, {"total": 0, "new": 0, "learning": 0, "due": 0})
+                self._cache.set(deck_id, counts[deck_id])
+
+        return [DeckSummary(deck_id=deck.id, title=deck.title, **counts[deck.id]) for deck in decks]
+
+    def invalidate(self, *deck_ids: int):
+        """Сбрасывает сводку колод, в которых изменились карточки"""
+        self._cache.invalidate(*deck_ids)
+
+    @staticmethod
+    async def _count(db: AsyncSession, deck_ids: list[int]) -> dict[int, dict]:
+        now = datetime.utcnow()
+        card = models.Card
+        # Новая — ни разу не повторённая, как и в дневной очереди. Забытая карточка
+        # (repetitions сброшен в 0) уже повторялась и считается изучаемой
+        new = card.last_review.is_(None) & (card.repetitions == 0)
+        rows = (await db.execute(
+            select(
+                card.deck_id,
+                func.count().label("total"),
+                func.sum(case((new, 1), else_=0)).label("new"),
+                func.sum(case((~new & (card.interval < MATURE_INTERVAL), 1), else_=0)).label("learning"),
+                func.sum(case((card.next_review <= now, 1), else_=0)).label("due"),
+            )
+            .where(card.deck_id.in_(deck_ids))
+            .group_by(card.deck_id)
+        )).all()
+        return {
+            row.deck_id: {"total": row.total, "new": row.new, "learning": row.learning, "due": row.due}
+            for row in rows
+        }
+
+
+deck_stats_service = DeckStatsService(ttl=settings.DECK_SUMMARY_TTL)
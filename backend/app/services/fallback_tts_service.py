@@ -1,39 +1,44 @@
-import os
-import uuid
-import asyncio
+import time
 from fastapi import HTTPException
-from app.services.file_service import file_service
+from app.core.config import settings
+from app.core.metrics import timed
+from app.services.media_store import StoredBlob, media_store
+from app.services.tts_cache import tts_cache
+from app.services.tts_executor import tts_executor
 
 class FallbackTTSService:
     """Альтернативный TTS сервис для разработки без Google Cloud"""
     
-    async def generate_speech(self, text: str, language_code: str = "ru-RU") -> str:
-        """Генерирует заглушку для аудио файла (для разработки)"""
+    async def generate_speech(self, text: str, language_code: str = "ru-RU", voice_name: str | None = None) -> str:
+        """Генерирует заглушку для аудио файла (для разработки), повторы берёт из кэша"""
         
         if len(text) > 5000:
             raise HTTPException(status_code=400, detail="Текст слишком длинный")
         
+        key = tts_cache.make_key("fallback", text, language_code, voice_name, {"audio_encoding": "TXT"})
+        return await tts_cache.get_or_create(key, lambda: self._synthesize(text))
+    
+    @timed("tts_fallback")
+    async def _synthesize(self, text: str) -> StoredBlob:
         try:
-            # Создаем заглушку - в реальном приложении здесь будет TTS
-            # Для демонстрации создаем пустой аудио файл или используем предзаписанные фразы
-            
-            filename = f"{uuid.uuid4()}.mp3"
-            file_path = os.path.join(file_service.audio_dir, filename)
-            
-            # Создаем простой текстовый файл с информацией о TTS
-            # В реальном приложении здесь будет генерация аудио
-            with open(file_path, "w") as f:
-                f.write(f"TTS Audio Stub for: {text}")
-            
-            # Переименовываем в .txt для ясности, что это заглушка
-            txt_file_path = file_path.replace('.mp3', '.txt')
-            os.rename(file_path, txt_file_path)
-            
-            return f"/api/v1/media/files/uploads/audio/{filename.replace('.mp3', '.txt')}"
+            # Создаем заглушку - в реальном приложении здесь будет TTS.
+            # Идёт через тот же ограниченный пул, что и Google TTS, поэтому годится
+            # как локальная замена в нагрузочных тестах
+            stub = await tts_executor.run(self._render_stub, text)
+            # Сохраняем текстовую заглушку (.txt для ясности, что это не настоящее аудио)
+            # в хранилище — одинаковые фразы хранятся один раз
+            return await media_store.save_bytes(stub, "txt", "audio")
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Ошибка генерации TTS: {str(e)}")
     
+    @staticmethod
+    def _render_stub(text: str) -> bytes:
+        """Имитирует блокирующий вызов внешнего TTS с задержкой TTS_FALLBACK_LATENCY_MS"""
+        if settings.TTS_FALLBACK_LATENCY_MS:
+            time.sleep(settings.TTS_FALLBACK_LATENCY_MS / 1000)
+        return f"TTS Audio Stub for: {text}".encode()
+    
     def is_available(self) -> bool:
         """Всегда доступен для разработки"""
         return True
@@ -1,66 +1,92 @@
 import os
-import uuid
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import UploadFile, HTTPException
 from PIL import Image
-import shutil
+from app.core.config import settings
+from app.core.metrics import timed
+from app.services.media_store import StoredBlob, media_store
+
+
+def _make_thumbnail(image_path: str, size: tuple):
+    """Декодирует изображение и сохраняет уменьшенную копию (выполняется в отдельном процессе)"""
+    with Image.open(image_path) as img:
+        img.thumbnail(size)
+        base, ext = os.path.splitext(image_path)
+        thumbnail_path = f"{base}_thumb{ext}"
+        img.save(thumbnail_path)
+
 
 class FileService:
     def __init__(self):
         self.upload_dir = "uploads"
-        self.images_dir = os.path.join(self.upload_dir, "images")
-        self.audio_dir = os.path.join(self.upload_dir, "audio")
-        self._create_directories()
-    
-    def _create_directories(self):
-        """Создает необходимые директории для файлов"""
-        os.makedirs(self.images_dir, exist_ok=True)
-        os.makedirs(self.audio_dir, exist_ok=True)
-    
-    async def save_image(self, file: UploadFile) -> str:
-        """Сохраняет изображение и возвращает путь к файлу"""
+        # Пул процессов для миниатюр создаётся при первой загрузке изображения
+        self._thumbnail_pool: ProcessPoolExecutor | None = None
+        self._thumbnail_slots = asyncio.Semaphore(settings.THUMBNAIL_WORKERS * 2)
+        self._thumbnail_tasks: set[asyncio.Task] = set()
+
+    async def save_image(self, file: UploadFile) -> StoredBlob:
+        """Принимает изображение; на место блоба его кладёт place()"""
         # Проверяем что файл является изображением
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Файл должен быть изображением")
-        
-        # Генерируем уникальное имя файла
-        file_extension = file.filename.split('.')[-1]
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(self.images_dir, filename)
-        
-        # Сохраняем файл
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Создаем thumbnail (опционально)
-        self._create_thumbnail(file_path)
-        
-        return f"/uploads/images/{filename}"
-    
-    async def save_audio(self, file: UploadFile) -> str:
-        """Сохраняет аудио файл и возвращает путь"""
+
+        # Сохраняем файл потоково под его sha256 — одинаковые загрузки хранятся один раз
+        return await media_store.save_upload(file, "image", settings.MAX_IMAGE_SIZE)
+
+    async def save_audio(self, file: UploadFile) -> StoredBlob:
+        """Принимает аудио файл и возвращает блоб; на место его кладёт place()"""
         if not file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="Файл должен быть аудио")
-        
-        file_extension = file.filename.split('.')[-1]
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(self.audio_dir, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        return f"/uploads/audio/{filename}"
-    
-    def _create_thumbnail(self, image_path: str, size: tuple = (200, 200)):
-        """Создает thumbnail для изображения"""
-        try:
-            with Image.open(image_path) as img:
-                img.thumbnail(size)
-                base, ext = os.path.splitext(image_path)
-                thumbnail_path = f"{base}_thumb{ext}"
-                img.save(thumbnail_path)
-        except Exception as e:
-            print(f"Ошибка создания thumbnail: {e}")
-    
+
+        return await media_store.save_upload(file, "audio", settings.MAX_AUDIO_SIZE)
+
+    async def place(self, blob: StoredBlob) -> StoredBlob:
+        """Переносит загрузку на место блоба после коммита привязки к карточке"""
+        blob = await media_store.place(blob)
+        # Миниатюру строим в фоне и только для нового содержимого
+        if blob.kind == "image" and blob.created:
+            self._schedule_thumbnail(blob.path)
+        return blob
+
+    def _schedule_thumbnail(self, image_path: str):
+        """Ставит построение миниатюры в фоновую очередь"""
+        task = asyncio.get_running_loop().create_task(self._create_thumbnail(image_path))
+        # Держим ссылку на задачу, иначе её может собрать сборщик мусора
+        self._thumbnail_tasks.add(task)
+        task.add_done_callback(self._thumbnail_tasks.discard)
+
+    @timed("thumbnail")
+    async def _create_thumbnail(self, image_path: str, size: tuple = (200, 200)):
+        """Создает thumbnail для изображения в ограниченном пуле процессов"""
+        async with self._thumbnail_slots:
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._get_thumbnail_pool(), _make_thumbnail, image_path, size)
+            except Exception as e:
+                print(f"Ошибка создания thumbnail: {e}")
+
+    def _get_thumbnail_pool(self) -> ProcessPoolExecutor:
+        if self._thumbnail_pool is None:
+            # spawn: форк процесса с потоками event loop и пула потоков небезопасен
+            self._thumbnail_pool = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._thumbnail_pool
+
+    def close(self):
+        """Останавливает пул миниатюр (при завершении приложения)"""
+        if self._thumbnail_pool is not None:
+            self._thumbnail_pool.shutdown(wait=False, cancel_futures=True)
+            self._thumbnail_pool = None
+
+    def get_thumbnail_url(self, file_url: str) -> str:
+        """Возвращает URL миниатюры для URL изображения"""
+        base, ext = os.path.splitext(file_url)
+        return f"{base}_thumb{ext}"
+
     def get_file_path(self, file_url: str) -> str:
         """Возвращает полный путь к файлу по URL"""
         if file_url.startswith('/uploads/'):
@@ -0,0 +1,183 @@
+import io
+import csv
+import json
+from datetime import datetime
+from typing import Iterator
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.core.config import settings
+from app.schemas.card import ImportResult, ImportRowError
+from app.services.srs_service import SRSService
+from app.services.write_queue import write_queue
+
+IMPORT_FORMATS = ("csv", "tsv", "anki", "jsonl")
+
+# Колонки, которые уходят в экспорт. Импорт читает из них только question и answer:
+# прогресс повторения не переносится, импортированные карточки начинают с нуля
+EXPORT_COLUMNS = (
+    models.Card.id,
+    models.Card.question,
+    models.Card.answer,
+    models.Card.ease_factor,
+    models.Card.interval,
+    models.Card.repetitions,
+    models.Card.next_review,
+    models.Card.created_at,
+    models.Card.updated_at,
+)
+
+
+def detect_format(filename: str | None, requested: str | None) -> str:
+    """Формат файла: явно указанный или по расширению"""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Неизвестный формат: {requested}")
+        return requested
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension in ("tsv", "txt"):
+        return "anki"
+    return "csv"
+
+
+def _csv_rows(stream: io.TextIOBase, delimiter: str, comments: bool) -> Iterator[tuple[int, dict | str]]:
+    """Строки CSV/TSV; заголовок question,answer необязателен"""
+    reader = csv.reader(stream, delimiter=delimiter)
+    columns = None
+    for line_number, values in enumerate(reader, start=1):
+        if not values or not any(value.strip() for value in values):
+            continue
+        # Экспорт Anki начинается со служебных строк вида "#separator:tab"
+        if comments and values[0].startswith("#"):
+            continue
+        if columns is None:
+            header = [value.strip().lower() for value in values]
+            if "question" in header and "answer" in header:
+                columns = (header.index("question"), header.index("answer"))
+                continue
+            columns = (0, 1)
+        if len(values) <= max(columns):
+            yield line_number, "Ожидается минимум два поля: вопрос и ответ"
+            continue
+        yield line_number, {"question": values[columns[0]], "answer": values[columns[1]]}
+
+
+def _jsonl_rows(stream: io.TextIOBase) -> Iterator[tuple[int, dict | str]]:
+    """Строки JSONL: объект с полями question/answer (или front/back)"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, "Некорректный JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, "Ожидается JSON-объект"
+            continue
+        yield line_number, {
+            "question": data.get("question", data.get("front")),
+            "answer": data.get("answer", data.get("back")),
+        }
+
+
+def _validate(row: dict) -> str | None:
+    for field in ("question", "answer"):
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f"Поле {field} должно быть непустой строкой"
+    return None
+
+
+def _read_chunk(rows: Iterator, size: int) -> tuple[list, str | None]:
+    """
+    Читает следующий кусок строк (выполняется в пуле потоков — это файловый ввод-вывод).
+
+    Ошибка чтения не теряет строки, прочитанные до неё: они возвращаются вместе с причиной.
+    """
+    chunk = []
+    try:
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= size:
+                break
+    except (UnicodeDecodeError, csv.Error) as e:
+        return chunk, f"Не удалось прочитать файл: {e}"
+    return chunk, None
+
+
+async def import_cards(deck_id: int, file: UploadFile, file_format: str, batch_size: int) -> ImportResult:
+    """
+    Потоково разбирает файл и вставляет карточки пачками по batch_size.
+
+    Каждая пачка коммитится сразу, поэтому ошибка чтения посреди файла не откатывает
+    уже записанное: импорт останавливается, а в результате — imported и причина в aborted.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    if file_format == "jsonl":
+        rows = _jsonl_rows(stream)
+    else:
+        rows = _csv_rows(stream, delimiter="," if file_format == "csv" else "\t", comments=file_format != "csv")
+
+    result = ImportResult(imported=0, failed=0, errors=[])
+    try:
+        while result.aborted is None:
+            chunk, result.aborted = await run_in_threadpool(_read_chunk, rows, batch_size)
+            if not chunk:
+                break
+
+            rows_to_insert = []
+            for line_number, row in chunk:
+                error = row if isinstance(row, str) else _validate(row)
+                if error:
+                    result.failed += 1
+                    if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+                        result.errors.append(ImportRowError(row=line_number, detail=error))
+                    else:
+                        result.errors_truncated = True
+                    continue
+                rows_to_insert.append((row["question"].strip(), row["answer"].strip()))
+
+            if rows_to_insert:
+                # Один executemany на пачку вместо INSERT + COMMIT + REFRESH на каждую карточку
+                await write_queue.submit(lambda db, batch=rows_to_insert: _insert_batch(db, deck_id, batch))
+                result.imported += len(rows_to_insert)
+    finally:
+        stream.detach()
+
+    return result
+
+
+async def _insert_batch(db: AsyncSession, deck_id: int, rows: list[tuple[str, str]]):
+    """
+    Вставляет пачку карточек (задание очереди записи).
+
+    Время и состояние SRS берутся уже внутри транзакции: ожидание в очереди может быть
+    дольше SYNC_LAG, и updated_at из прошлого оказался бы позади курсора синхронизации.
+    """
+    # Состояние SRS по умолчанию для новой карточки
+    review = SRSService.get_default_review()
+    now = datetime.utcnow()
+    await db.execute(insert(models.Card), [
+        {
+            "question": question,
+            "answer": answer,
+            "deck_id": deck_id,
+            "ease_factor": review.ease_factor,
+            "interval": review.interval,
+            "repetitions": review.repetitions,
+            "next_review": review.next_review,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for question, answer in rows
+    ])
+
+
+def export_query(deck_id: int):
+    """Запрос для экспорта колоды: только нужные колонки, по порядку id"""
+    return select(*EXPORT_COLUMNS).where(models.Card.deck_id == deck_id).order_by(models.Card.id)
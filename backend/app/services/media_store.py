@@ -0,0 +1,309 @@
+import os
+import re
+import uuid
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.database import upsert
+from app.services.write_queue import write_queue
+
+# Размер куска при потоковой записи загрузки на диск
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredBlob:
+    name: str       # "<sha256>.<расширение>" — ключ блоба в хранилище и в БД
+    kind: str       # image / audio
+    size: int
+    url: str
+    path: str
+    created: bool   # файл записан впервые (а не найден готовый с тем же содержимым)
+    temp_path: str | None = None  # загрузка, ещё не перенесённая на место блоба (см. place)
+
+
+class MediaStore:
+    """Контентно-адресуемое хранилище медиа: каждый уникальный файл лежит на диске один раз"""
+
+    def __init__(self, root: str = "uploads"):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    @staticmethod
+    def normalize_extension(filename: str | None, default: str = "bin") -> str:
+        """Расширение из имени файла клиента — только буквы и цифры, чтобы не выйти из каталога"""
+        filename = filename or ""
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        return extension if re.fullmatch(r"[a-z0-9]{1,10}", extension) else default
+
+    def blob_path(self, name: str) -> str:
+        # Раскладываем по подкаталогам из первых символов хэша, чтобы не держать
+        # сотни тысяч файлов в одной директории
+        return os.path.join(self.blobs_dir, name[:2], name)
+
+    def blob_url(self, name: str) -> str:
+        return f"/uploads/blobs/{name[:2]}/{name}"
+
+    @staticmethod
+    def name_from_url(url: str) -> str:
+        return url.rsplit("/", 1)[-1]
+
+    async def blob_from_url(self, url: str, kind: str) -> StoredBlob:
+        """Восстанавливает описание блоба по его URL (например, из кэша TTS)"""
+        name = self.name_from_url(url)
+        path = self.blob_path(name)
+        size = await run_in_threadpool(os.path.getsize, path)
+        return StoredBlob(name=name, kind=kind, size=size, url=url, path=path, created=False)
+
+    async def save_upload(self, file: UploadFile, kind: str, max_size: int) -> StoredBlob:
+        """
+        Потоково пишет загрузку во временный файл, считая sha256 на лету.
+
+        Файл остаётся временным: на место блоба его переносит place() после коммита
+        привязки к карточке — иначе remove() для сироты с тем же содержимым мог бы
+        удалить файл между проверкой «уже есть» и появлением ссылки на него.
+        """
+        extension = self.normalize_extension(file.filename)
+        temp_path = await run_in_threadpool(self._open_temp)
+        digest = hashlib.sha256()
+        size = 0
+        buffer = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail="Файл слишком большой")
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            await run_in_threadpool(os.remove, temp_path)
+            raise
+        await run_in_threadpool(buffer.close)
+
+        name = f"{digest.hexdigest()}.{extension}"
+        path = self.blob_path(name)
+        return StoredBlob(
+            name=name, kind=kind, size=size, url=self.blob_url(name), path=path, created=False, temp_path=temp_path
+        )
+
+    async def place(self, blob: StoredBlob) -> StoredBlob:
+        """Переносит загрузку на место блоба (после коммита привязки)"""
+        return await run_in_threadpool(self._place, blob.temp_path, blob.name, blob.kind, blob.size)
+
+    async def discard(self, blob: StoredBlob):
+        """Удаляет загрузку, которую так и не привязали к карточке"""
+        if blob.temp_path is not None:
+            await run_in_threadpool(self._remove_temp, blob.temp_path)
+
+    async def save_bytes(self, data: bytes, extension: str, kind: str) -> StoredBlob:
+        """
+        Сохраняет готовые байты (например, результат синтеза речи).
+
+        Пишет мимо очереди и без строки в БД: до привязки к карточке файл может удалить
+        remove(), поэтому привязывающий код проверяет файл после attach() (см. narration_service).
+        """
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        return await run_in_threadpool(self._write_bytes, data, name, kind)
+
+    async def attach(self, db: AsyncSession, card_id: int, blob: StoredBlob) -> bool:
+        """Привязывает блоб к карточке и увеличивает счётчик ссылок (без коммита)"""
+        linked = await db.get(models.CardMedia, (card_id, blob.name))
+        if linked:
+            return False
+
+        # Строку блоба вставляет или обновляет один запрос: параллельная привязка того же
+        # содержимого не падает на первичном ключе, а в Postgres ждёт блокировки строки,
+        # которую держит remove()
+        blobs = models.MediaBlob.__table__
+        statement = upsert(db, blobs).values(
+            name=blob.name, kind=blob.kind, size=blob.size, ref_count=1, created_at=datetime.utcnow()
+        )
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"ref_count": blobs.c.ref_count + 1}
+        ))
+        db.add(models.CardMedia(card_id=card_id, blob_name=blob.name))
+        # Сессия без autoflush: повторная привязка того же блоба должна увидеть эту ссылку
+        await db.flush()
+        return True
+
+    async def detach(self, db: AsyncSession, card_id: int, name: str) -> list[str]:
+        """
+        Снимает одну ссылку карточки на блоб (без коммита).
+
+        Возвращает имя блоба, если на него больше никто не ссылается: файл удаляется
+        после коммита через remove().
+        """
+        deleted = await db.execute(
+            delete(models.CardMedia)
+            .where(models.CardMedia.card_id == card_id, models.CardMedia.blob_name == name)
+        )
+        if not deleted.rowcount:
+            return []
+        ref_count = await db.scalar(
+            update(models.MediaBlob)
+            .where(models.MediaBlob.name == name)
+            .values(ref_count=models.MediaBlob.ref_count - 1)
+            .returning(models.MediaBlob.ref_count)
+        )
+        return [name] if ref_count is not None and ref_count <= 0 else []
+
+    async def clear_audio(self, db: AsyncSession, card: models.Card, *fields: str) -> list[str]:
+        """
+        Убирает у карточки озвучку (question_audio_url / answer_audio_url) и снимает
+        ссылки на её блобы (без коммита). Возвращает сирот для remove() после коммита.
+        """
+        urls = {getattr(card, field) for field in fields} - {None}
+        for field in fields:
+            setattr(card, field, None)
+        # Вопрос и ответ могут озвучиваться одним блобом — его ссылка ещё нужна
+        urls -= {card.question_audio_url, card.answer_audio_url}
+        orphans = []
+        for url in urls:
+            orphans += await self.detach(db, card.id, self.name_from_url(url))
+        return orphans
+
+    async def copy_card_media(self, db: AsyncSession, copies: dict[int, int]):
+        """
+        Копирует ссылки на медиа с карточек на их копии (без коммита).
+
+        copies — id оригинала -> id копии. Файлы не копируются — у блобов только
+        растут счётчики ссылок.
+        """
+        links = (await db.execute(
+            select(models.CardMedia.card_id, models.CardMedia.blob_name)
+            .where(models.CardMedia.card_id.in_(list(copies)))
+        )).all()
+        if not links:
+            return
+
+        now = datetime.utcnow()
+        await db.execute(insert(models.CardMedia), [
+            {"card_id": copies[link.card_id], "blob_name": link.blob_name, "created_at": now}
+            for link in links
+        ])
+        added = Counter(link.blob_name for link in links)
+        for name, references in added.items():
+            await db.execute(
+                update(models.MediaBlob)
+                .where(models.MediaBlob.name == name)
+                .values(ref_count=models.MediaBlob.ref_count + references)
+            )
+
+    async def release_cards(self, db: AsyncSession, card_ids) -> list[str]:
+        """
+        Снимает ссылки карточек на блобы (без коммита).
+
+        card_ids — список id или select(...) по карточкам. Возвращает имена блобов,
+        на которые больше никто не ссылается: их файлы удаляются после коммита через remove().
+        """
+        counts = (await db.execute(
+            select(models.CardMedia.blob_name, func.count())
+            .where(models.CardMedia.card_id.in_(card_ids))
+            .group_by(models.CardMedia.blob_name)
+        )).all()
+        if not counts:
+            return []
+
+        for name, references in counts:
+            await db.execute(
+                update(models.MediaBlob)
+                .where(models.MediaBlob.name == name)
+                .values(ref_count=models.MediaBlob.ref_count - references)
+            )
+        await db.execute(delete(models.CardMedia).where(models.CardMedia.card_id.in_(card_ids)))
+
+        names = [name for name, _ in counts]
+        return list((await db.scalars(
+            select(models.MediaBlob.name)
+            .where(models.MediaBlob.name.in_(names), models.MediaBlob.ref_count <= 0)
+        )).all())
+
+    async def remove(self, names: list[str]):
+        """
+        Удаляет файлы блобов, на которые не ссылается ни одна карточка, вместе с миниатюрами.
+
+        Строки блобов блокируются (SELECT ... FOR UPDATE) до коммита, файлы удаляются
+        под блокировкой вместе со строками. Привязка того же содержимого к другой карточке
+        (upsert в attach()) выполняется либо до этого (и файл остаётся), либо после —
+        и её place() кладёт файл заново. У файлов из save_bytes, ещё не привязанных
+        ни к одной карточке, строки нет: её вставляем, чтобы было что блокировать.
+        В SQLite то же обеспечивает очередь записи.
+        """
+        if not names:
+            return
+
+        async def job(db: AsyncSession):
+            await db.execute(
+                upsert(db, models.MediaBlob.__table__)
+                .values([
+                    # Строка-заглушка живёт только до конца задания
+                    {"name": name, "kind": "audio", "size": 0, "ref_count": 0, "created_at": datetime.utcnow()}
+                    for name in names
+                ])
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            orphans = (await db.scalars(
+                select(models.MediaBlob.name)
+                .where(models.MediaBlob.name.in_(names), models.MediaBlob.ref_count <= 0)
+                .with_for_update()
+            )).all()
+            if not orphans:
+                return
+            await run_in_threadpool(self._remove_files, orphans)
+            await db.execute(delete(models.MediaBlob).where(models.MediaBlob.name.in_(orphans)))
+
+        await write_queue.submit(job)
+
+    def _open_temp(self) -> str:
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4()}.part")
+
+    @staticmethod
+    def _remove_temp(temp_path: str):
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def _place(self, temp_path: str, name: str, kind: str, size: int) -> StoredBlob:
+        """Переносит временный файл на место блоба, если такого содержимого ещё нет"""
+        path = self.blob_path(name)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            created = False
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            created = True
+        return StoredBlob(name=name, kind=kind, size=size, url=self.blob_url(name), path=path, created=created)
+
+    def _write_bytes(self, data: bytes, name: str, kind: str) -> StoredBlob:
+        path = self.blob_path(name)
+        if os.path.exists(path):
+            return StoredBlob(name=name, kind=kind, size=len(data), url=self.blob_url(name), path=path, created=False)
+        temp_path = self._open_temp()
+        with open(temp_path, "wb") as out:
+            out.write(data)
+        return self._place(temp_path, name, kind, len(data))
+
+    def _remove_files(self, names: list[str]):
+        for name in names:
+            path = self.blob_path(name)
+            base, ext = os.path.splitext(path)
+            for candidate in (path, f"{base}_thumb{ext}"):
+                try:
+                    os.remove(candidate)
+                except FileNotFoundError:
+                    pass
+
+
+media_store = MediaStore()
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services.media_store import media_store
+from app.services.tts_service import tts_service
+from app.services.write_queue import write_queue
+from app.services.response_cache import response_cache
+
+
+@dataclass
+class NarrationJob:
+    id: str
+    deck_id: int
+    language_code: str
+    voice_name: str | None = None
+    status: str = "pending"  # pending / running / done / failed
+    total: int = 0      # карточек в колоде
+    skipped: int = 0    # уже были озвучены или изменились (удалены) во время синтеза
+    done: int = 0       # озвучены этой задачей
+    failed: int = 0     # синтез не удался
+    error: str | None = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+
+
+class NarrationService:
+    """Фоновая озвучка колод: заранее синтезирует аудио для вопросов и ответов"""
+
+    def __init__(self, concurrency: int, chunk_size: int, max_finished_jobs: int = 100):
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: dict[str, NarrationJob] = {}
+        self._active: dict[int, str] = {}  # deck_id -> id задачи
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, deck_id: int, language_code: str, voice_name: str | None = None) -> NarrationJob:
+        """Запускает озвучку колоды; если она уже идёт — возвращает текущую задачу"""
+        active_id = self._active.get(deck_id)
+        if active_id is not None:
+            return self._jobs[active_id]
+
+        job = NarrationJob(id=uuid.uuid4().hex, deck_id=deck_id, language_code=language_code, voice_name=voice_name)
+        self._jobs[job.id] = job
+        self._active[deck_id] = job.id
+        self._forget_finished()
+
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> NarrationJob | None:
+        return self._jobs.get(job_id)
+
+    async def close(self):
+        """Отменяет незавершённые задачи (при завершении приложения)"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, job: NarrationJob):
+        job.status = "running"
+        try:
+            await tts_service.initialize()
+            if not tts_service.is_available():
+                # Заглушка пишет текстовый файл вместо аудио — такие ссылки в карточки не сохраняем
+                raise RuntimeError("TTS сервис недоступен. Проверьте настройки Google Cloud.")
+            missing = or_(models.Card.question_audio_url.is_(None), models.Card.answer_audio_url.is_(None))
+
+            async with AsyncSessionLocal() as db:
+                job.total = await db.scalar(
+                    select(func.count()).select_from(models.Card).where(models.Card.deck_id == job.deck_id)
+                )
+                pending = await db.scalar(
+                    select(func.count()).select_from(models.Card)
+                    .where(models.Card.deck_id == job.deck_id, missing)
+                )
+            job.skipped = job.total - pending
+
+            slots = asyncio.Semaphore(self.concurrency)
+            last_id = 0
+            while True:
+                # Идём по колоде кусками по id, чтобы не держать её целиком в памяти
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(
+                        select(
+                            models.Card.id,
+                            models.Card.question,
+                            models.Card.answer,
+                            models.Card.question_audio_url,
+                            models.Card.answer_audio_url
+                        )
+                        .where(models.Card.deck_id == job.deck_id, models.Card.id > last_id, missing)
+                        .order_by(models.Card.id)
+                        .limit(self.chunk_size)
+                    )).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                narrated = await asyncio.gather(
+                    *(self._narrate(row, slots, job) for row in rows),
+                    return_exceptions=True
+                )
+                results = []
+                for row, result in zip(rows, narrated):
+                    if isinstance(result, Exception):
+                        job.failed += 1
+                        job.error = str(result)
+                    else:
+                        results.append((row, result))
+
+                if results:
+                    stored = await write_queue.submit(lambda db: self._store(db, results))
+                    # В карточках появились ссылки на аудио
+                    await response_cache.bump_decks(job.deck_id)
+                    job.done += stored
+                    job.skipped += len(results) - stored
+
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._active.pop(job.deck_id, None)
+
+    async def _narrate(self, row, slots: asyncio.Semaphore, job: NarrationJob) -> tuple:
+        """Синтезирует недостающие дорожки одной карточки"""
+        async with slots:
+            question_url = row.question_audio_url or await tts_service.generate_speech(
+                row.question, job.language_code, job.voice_name
+            )
+            answer_url = row.answer_audio_url or await tts_service.generate_speech(
+                row.answer, job.language_code, job.voice_name
+            )
+        return question_url, answer_url
+
+    async def _store(self, db: AsyncSession, results: list) -> int:
+        """
+        Записывает ссылки на аудио в карточки и учитывает их в счётчиках ссылок.
+        Возвращает число карточек, получивших хотя бы одну дорожку
+        """
+        stored = 0
+        for row, (question_url, answer_url) in results:
+            card = await db.get(models.Card, row.id)
+            # Карточку удалили или отредактировали, пока шёл синтез — аудио уже не про неё
+            if card is None:
+                continue
+            changed = False
+            if card.question_audio_url is None and card.question == row.question:
+                if await self._attach(db, card.id, question_url):
+                    card.question_audio_url = question_url
+                    changed = True
+            if card.answer_audio_url is None and card.answer == row.answer:
+                if await self._attach(db, card.id, answer_url):
+                    card.answer_audio_url = answer_url
+                    changed = True
+            stored += changed
+        return stored
+
+    @staticmethod
+    async def _attach(db: AsyncSession, card_id: int, url: str) -> bool:
+        """Привязывает аудио к карточке; False — файл успели удалить как сироту"""
+        try:
+            blob = await media_store.blob_from_url(url, "audio")
+        except FileNotFoundError:
+            # Карточка останется без озвучки до следующего запуска: кэш TTS тоже промахнётся
+            return False
+        await media_store.attach(db, card_id, blob)
+        # В Postgres attach() дождался remove() того же блоба — файла могло уже не стать
+        if not await run_in_threadpool(os.path.exists, blob.path):
+            await media_store.detach(db, card_id, blob.name)
+            return False
+        return True
+
+    def _forget_finished(self):
+        """Держит в памяти ограниченное число завершённых задач"""
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.id]
+
+
+narration_service = NarrationService(
+    concurrency=settings.NARRATION_CONCURRENCY,
+    chunk_size=settings.NARRATION_CHUNK_SIZE
+)
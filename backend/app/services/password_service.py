@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном ограниченном пуле процессов.
+
+    Одновременно считается не больше workers хэшей, ещё max_pending запросов
+    ждут своей очереди; остальные сразу получают 429, а не копятся в памяти
+    и не тянут за собой время ответа всех остальных запросов.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(workers)
+        self._pending = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Проверяет пароль; второй элемент — новый хэш, если сменилась стоимость bcrypt"""
+        return await self._run(verify_and_update_password, password, hashed_password)
+
+    async def _run(self, func, *args):
+        if self._pending >= self.workers + self.max_pending:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много одновременных входов, повторите попытку",
+                headers={"Retry-After": "1"}
+            )
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                pool = self._get_pool()
+                try:
+                    return await loop.run_in_executor(pool, func, *args)
+                except BrokenProcessPool:
+                    # Процесс пула упал (например, убит OOM) — пул больше не принимает задачи.
+                    # Пересоздаём его и повторяем один раз
+                    self._drop_pool(pool)
+                    return await loop.run_in_executor(self._get_pool(), func, *args)
+        finally:
+            self._pending -= 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: форк процесса с потоками event loop и пула потоков небезопасен
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _drop_pool(self, pool: ProcessPoolExecutor):
+        """Убирает сломанный пул, если его ещё не заменил параллельный запрос"""
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Останавливает пул (при завершении приложения)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_QUEUE
+)
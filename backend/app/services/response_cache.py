@@ -0,0 +1,193 @@
+import json
+import uuid
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Заголовки ответа, которые сохраняются вместе с телом (например, курсор следующей страницы)
+_SKIPPED_HEADERS = {"content-length", "etag", "cache-control"}
+
+
+class MemoryBackend:
+    """
+    Счётчики версий и тела ответов в памяти процесса — только для одного воркера:
+    изменение, сделанное в другом процессе, здесь не увеличит версию и 304 отдаст
+    устаревшие данные. С несколькими воркерами нужен REDIS_URL.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_versions: int):
+        # Эпоха процесса: после перезапуска счётчики снова с нуля, а старые ETag не должны совпасть
+        self._epoch = uuid.uuid4().hex[:8]
+        # Версии берутся из одного растущего счётчика, в памяти — только max_versions
+        # последних изменённых ключей. Вытесненный ключ читается как наибольшая
+        # вытесненная версия: она не меньше его прежней, так что версия не идёт назад
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._max_versions = max_versions
+        self._clock = itertools.count(1)
+        self._floor = 0
+        self._bodies = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    async def epoch(self) -> str:
+        return self._epoch
+
+    async def versions(self, keys: list[str]) -> list[int]:
+        return [self._versions.get(key, self._floor) for key in keys]
+
+    async def bump(self, keys: list[str]):
+        for key in keys:
+            self._versions[key] = next(self._clock)
+            self._versions.move_to_end(key)
+        while len(self._versions) > self._max_versions:
+            _, version = self._versions.popitem(last=False)
+            self._floor = max(self._floor, version)
+
+    async def get_body(self, etag: str) -> bytes | None:
+        return self._bodies.get(etag)
+
+    async def set_body(self, etag: str, value: bytes):
+        self._bodies.set(etag, value)
+
+
+class RedisBackend:
+    """То же в Redis: версии общие для всех воркеров и переживают перезапуск"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "flashlearn:"):
+        # redis — необязательная зависимость, нужна только при REDIS_URL
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._ttl = int(ttl)
+        self._prefix = prefix
+        self._epoch: str | None = None
+
+    async def epoch(self) -> str:
+        if self._epoch is None:
+            # Если Redis очистят, появится новая эпоха — и старые ETag перестанут совпадать
+            key = self._prefix + "epoch"
+            await self._redis.set(key, uuid.uuid4().hex[:8], nx=True)
+            self._epoch = (await self._redis.get(key)).decode()
+        return self._epoch
+
+    async def versions(self, keys: list[str]) -> list[int]:
+        values = await self._redis.mget([self._prefix + "v:" + key for key in keys])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, keys: list[str]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(self._prefix + "v:" + key)
+            await pipe.execute()
+
+    async def get_body(self, etag: str) -> bytes | None:
+        return await self._redis.get(self._prefix + "body:" + etag)
+
+    async def set_body(self, etag: str, value: bytes):
+        await self._redis.set(self._prefix + "body:" + etag, value, ex=self._ttl)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class ResponseCache:
+    """
+    Условные GET по ETag для чтения колод и карточек.
+
+    ETag строится из счётчиков версий (колоды пользователя, конкретная колода),
+    пользователя и параметров запроса. Изменения увеличивают счётчик уже после
+    коммита, поэтому совпавший If-None-Match даёт 304 без обращения к БД,
+    а готовые тела ответов лежат в LRU под своим ETag.
+    """
+
+    def __init__(self, backend, max_body: int):
+        self.backend = backend
+        self.max_body = max_body
+
+    @staticmethod
+    def deck_key(deck_id: int) -> str:
+        """Версия колоды и её карточек"""
+        return f"deck:{deck_id}"
+
+    @staticmethod
+    def decks_key(user_id: int) -> str:
+        """Версия списка колод пользователя"""
+        return f"decks:{user_id}"
+
+    async def bump(self, *keys: str):
+        if keys:
+            await self.backend.bump(list(keys))
+
+    async def bump_decks(self, *deck_ids: int):
+        await self.bump(*(self.deck_key(deck_id) for deck_id in deck_ids))
+
+    async def respond(
+            self,
+            request: Request,
+            user_id: int,
+            keys: list[str],
+            build: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Отдаёт 304, тело из кэша или строит ответ через build и кэширует его"""
+        etag = await self._etag(request, user_id, keys)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        cached = await self.backend.get_body(etag)
+        if cached is not None:
+            meta, body = cached.split(b"\n", 1)
+            return Response(body, media_type="application/json", headers={**json.loads(meta), **headers})
+
+        response = await build()
+        extra = {
+            name: value for name, value in response.headers.items()
+            if name not in _SKIPPED_HEADERS and name != "content-type"
+        }
+        if len(response.body) <= self.max_body:
+            await self.backend.set_body(etag, json.dumps(extra).encode() + b"\n" + response.body)
+        return Response(response.body, media_type="application/json", headers={**extra, **headers})
+
+    async def _etag(self, request: Request, user_id: int, keys: list[str]) -> str:
+        versions = await self.backend.versions(keys)
+        variant = json.dumps(
+            [request.url.path, sorted(request.query_params.multi_items()), user_id],
+            separators=(",", ":")
+        )
+        digest = hashlib.sha1(variant.encode()).hexdigest()[:16]
+        version = ".".join(str(value) for value in versions)
+        return f'W/"{await self.backend.epoch()}-{version}-{digest}"'
+
+    async def close(self):
+        if isinstance(self.backend, RedisBackend):
+            await self.backend.close()
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    """
+    Слабое сравнение If-None-Match (RFC 9110): W/ не учитывается.
+
+    «*» игнорируется: ETag считается до того, как build() проверит, что ресурс
+    существует, и 304 на «*» подтвердил бы и колоду, которой нет (или чужую)
+    """
+    if not header:
+        return False
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def _make_backend():
+    if settings.REDIS_URL:
+        return RedisBackend(settings.REDIS_URL, ttl=settings.RESPONSE_CACHE_TTL)
+    if settings.WEB_CONCURRENCY > 1:
+        raise RuntimeError("Кэш ответов в памяти работает только с одним воркером: задайте REDIS_URL")
+    return MemoryBackend(
+        max_entries=settings.RESPONSE_CACHE_SIZE,
+        ttl=settings.RESPONSE_CACHE_TTL,
+        max_versions=settings.RESPONSE_CACHE_VERSIONS
+    )
+
+
+response_cache = ResponseCache(_make_backend(), max_body=settings.RESPONSE_CACHE_MAX_BODY)
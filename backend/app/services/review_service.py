@@ -0,0 +1,287 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+from app.schemas.card import ReviewBatchItem, ReviewResponse
+from app.services.schedulers import CardStates, get_scheduler
+from app.services.srs_service import SRSService
+
+
+def _to_naive_utc(moment: datetime | None, now: datetime) -> datetime:
+    """Приводит время ответа клиента к naive UTC и не пускает его в будущее"""
+    if moment is None:
+        return now
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(moment, now)
+
+
+async def apply_reviews(
+        db: AsyncSession,
+        entries: list[ReviewBatchItem],
+        user_id: int | None = None
+) -> list[ReviewResponse]:
+    """
+    Применяет пачку ответов: одна выборка, векторизованный планировщик колоды и один bulk UPDATE.
+
+    С user_id учитываются только карточки из колод этого пользователя.
+    Каждый ответ попадает в review_logs. Коммит остаётся за вызывающим кодом,
+    чтобы карточки и журнал записывались одной транзакцией.
+    """
+    now = datetime.utcnow()
+    card_ids = sorted({entry.card_id for entry in entries})
+
+    query = (
+        select(
+            models.Card.id,
+            models.Card.ease_factor,
+            models.Card.interval,
+            models.Card.repetitions,
+            models.Card.stability,
+            models.Card.difficulty,
+            models.Card.last_review,
+            models.Card.deck_id,
+            models.Deck.user_id,
+            models.Deck.scheduler,
+            models.Deck.desired_retention
+        )
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Card.id.in_(card_ids))
+    )
+    if user_id is not None:
+        query = query.where(models.Deck.user_id == user_id)
+    rows = (await db.execute(query)).all()
+
+    if len(rows) != len(card_ids):
+        found = {row.id for row in rows}
+        missing = [card_id for card_id in card_ids if card_id not in found]
+        raise HTTPException(status_code=404, detail=f"Карточки не найдены: {missing}")
+
+    position = {row.id: index for index, row in enumerate(rows)}
+    state = CardStates.from_rows(rows)
+    last_review = {row.id: row.last_review for row in rows}
+    schedulers = {
+        key: get_scheduler(*key) for key in {(row.scheduler, row.desired_retention) for row in rows}
+    }
+
+    # Одна карточка может встретиться в пачке несколько раз (офлайн-сессия).
+    # Раскладываем ответы по «раундам»: в раунде k — k-й по времени ответ на каждую
+    # карточку, тогда внутри раунда карточки не повторяются и считаются одним проходом.
+    answered = [_to_naive_utc(entry.answered_at, now) for entry in entries]
+    order = sorted(range(len(entries)), key=lambda index: answered[index])
+    rounds = defaultdict(list)
+    seen = defaultdict(int)
+    for index in order:
+        card_id = entries[index].card_id
+        # Раунд ещё делим по планировщику колоды: каждый считает свою часть массивов
+        row = rows[position[card_id]]
+        rounds[seen[card_id], (row.scheduler, row.desired_retention)].append(index)
+        seen[card_id] += 1
+
+    results: list[ReviewResponse | None] = [None] * len(entries)
+    next_review = {}
+    logs = []
+    for round_key in sorted(rounds, key=lambda key: key[0]):
+        indices = rounds[round_key]
+        slots = np.array([position[entries[index].card_id] for index in indices])
+        quality = np.array([entries[index].quality for index in indices])
+        elapsed_days = np.array([
+            _elapsed_days(last_review[entries[index].card_id], answered[index]) for index in indices
+        ])
+
+        previous = state.take(slots)
+        reviewed = schedulers[round_key[1]].review(quality, previous, elapsed_days)
+        if settings.SRS_FUZZ:
+            reviewed.interval = await _balance_load(
+                db,
+                [rows[position[entries[index].card_id]].user_id for index in indices],
+                [answered[index] for index in indices],
+                reviewed.interval
+            )
+        state.put(slots, reviewed)
+
+        for offset, index in enumerate(indices):
+            card_id = entries[index].card_id
+            row = rows[position[card_id]]
+            interval = int(reviewed.interval[offset])
+            logs.append({
+                "card_id": card_id,
+                "deck_id": row.deck_id,
+                "user_id": row.user_id,
+                "quality": entries[index].quality,
+                "duration_ms": entries[index].duration_ms,
+                "scheduler": round_key[1][0],
+                "elapsed_days": float(elapsed_days[offset]),
+                "prev_ease_factor": float(previous.ease_factor[offset]),
+                "prev_interval": int(previous.interval[offset]),
+                "prev_repetitions": int(previous.repetitions[offset]),
+                "prev_stability": _nullable(previous.stability[offset]),
+                "prev_difficulty": _nullable(previous.difficulty[offset]),
+                "ease_factor": float(reviewed.ease_factor[offset]),
+                "interval": interval,
+                "repetitions": int(reviewed.repetitions[offset]),
+                "stability": _nullable(reviewed.stability[offset]),
+                "difficulty": _nullable(reviewed.difficulty[offset]),
+                "reviewed_at": answered[index],
+                "created_at": now,
+            })
+            last_review[card_id] = answered[index]
+            next_review[card_id] = answered[index] + timedelta(days=interval)
+            results[index] = ReviewResponse(
+                card_id=card_id,
+                new_interval=interval,
+                new_repetitions=int(reviewed.repetitions[offset]),
+                new_ease_factor=float(reviewed.ease_factor[offset]),
+                next_review=next_review[card_id]
+            )
+
+    # Bulk UPDATE по первичному ключу: один executemany на всю пачку
+    await db.execute(
+        update(models.Card),
+        [
+            {
+                "id": row.id,
+                "ease_factor": float(state.ease_factor[slot]),
+                "interval": int(state.interval[slot]),
+                "repetitions": int(state.repetitions[slot]),
+                "stability": _nullable(state.stability[slot]),
+                "difficulty": _nullable(state.difficulty[slot]),
+                "last_review": last_review[row.id],
+                "next_review": next_review[row.id],
+                "updated_at": now,
+            }
+            for slot, row in enumerate(rows)
+        ]
+    )
+    await db.execute(insert(models.ReviewLog), logs)
+
+    return results
+
+
+async def reschedule_deck(
+        db: AsyncSession,
+        deck_id: int,
+        card_ids: list[int] | None = None,
+        chunk_size: int = 1000
+) -> int:
+    """
+    Пересчитывает интервалы карточек колоды её текущим планировщиком
+    (всех или только card_ids — например, перенесённых из другой колоды).
+
+    Карточки идут кусками по id; каждый кусок — один векторизованный проход и один bulk UPDATE.
+    """
+    deck = await db.get(models.Deck, deck_id)
+    if deck is None:
+        raise HTTPException(status_code=404, detail="Колода не найдена")
+    scheduler = get_scheduler(deck.scheduler, deck.desired_retention)
+    now = datetime.utcnow()
+    updated = 0
+    last_id = 0
+    while True:
+        query = (
+            select(
+                models.Card.id,
+                models.Card.ease_factor,
+                models.Card.interval,
+                models.Card.repetitions,
+                models.Card.stability,
+                models.Card.difficulty,
+                models.Card.last_review,
+                models.Card.next_review
+            )
+            .where(models.Card.deck_id == deck_id, models.Card.id > last_id)
+            .order_by(models.Card.id)
+            .limit(chunk_size)
+        )
+        if card_ids is not None:
+            query = query.where(models.Card.id.in_(card_ids))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+
+        state = scheduler.reschedule(CardStates.from_rows(rows))
+        # Пересчёт всей колоды сразу — иначе её карточки сойдутся в одни и те же дни.
+        # Разброс сдвигает только дату показа: в interval остаётся расчётное значение,
+        # иначе каждый пересчёт заново смещал бы его и ошибка копилась бы
+        due_in = SRSService.fuzz(state.interval) if settings.SRS_FUZZ else state.interval
+        mappings = []
+        for slot, row in enumerate(rows):
+            # Новые карточки (ещё без ответов) остаются в очереди как были
+            if row.last_review is None and row.repetitions == 0:
+                continue
+            reviewed_at = row.last_review
+            if reviewed_at is None and row.next_review is not None:
+                reviewed_at = row.next_review - timedelta(days=row.interval)
+            # Не от чего отсчитывать новый интервал
+            if reviewed_at is None:
+                continue
+            mappings.append({
+                "id": row.id,
+                "interval": int(state.interval[slot]),
+                "stability": _nullable(state.stability[slot]),
+                "difficulty": _nullable(state.difficulty[slot]),
+                "next_review": reviewed_at + timedelta(days=int(due_in[slot])),
+                "updated_at": now,
+            })
+        if mappings:
+            await db.execute(update(models.Card), mappings)
+            updated += len(mappings)
+
+
+async def _balance_load(
+        db: AsyncSession,
+        user_ids: list[int],
+        answered: list[datetime],
+        intervals: np.ndarray,
+        rng: np.random.Generator | None = None
+) -> np.ndarray:
+    """
+    Fuzz с балансировкой: из окна SRSService.fuzz_range выбирается день,
+    на который у пользователя запланировано меньше всего карточек
+    (из равных — случайный). Так ответы одного дня не собираются снова в один день.
+    Случайность — от общего генератора процесса, как у SRSService.fuzz.
+    """
+    low, high = SRSService.fuzz_range(intervals)
+    result = intervals.copy()
+    rng = rng or SRSService.rng()
+    day = func.date(models.Card.next_review)
+    for user_id in {user_id for user_id, lo, hi in zip(user_ids, low, high) if hi > lo}:
+        members = [index for index, owner in enumerate(user_ids) if owner == user_id and high[index] > low[index]]
+        start = min(answered[index] + timedelta(days=int(low[index])) for index in members).date()
+        end = max(answered[index] + timedelta(days=int(high[index])) for index in members).date()
+        # Загрузка по дням во всём окне — один сгруппированный запрос
+        load = {
+            str(row.day)[:10]: row.count for row in (await db.execute(
+                select(day.label("day"), func.count().label("count"))
+                .join(models.Deck, models.Deck.id == models.Card.deck_id)
+                .where(
+                    models.Deck.user_id == user_id,
+                    models.Card.next_review >= datetime.combine(start, datetime.min.time()),
+                    models.Card.next_review < datetime.combine(end + timedelta(days=1), datetime.min.time())
+                )
+                .group_by(day)
+            )).all()
+        }
+        for index in members:
+            options = range(int(low[index]), int(high[index]) + 1)
+            due = {option: (answered[index] + timedelta(days=option)).date().isoformat() for option in options}
+            chosen = min(options, key=lambda option: (load.get(due[option], 0), rng.random()))
+            load[due[chosen]] = load.get(due[chosen], 0) + 1
+            result[index] = chosen
+    return result
+
+
+def _elapsed_days(last_review: datetime | None, answered_at: datetime) -> float:
+    if last_review is None:
+        return 0.0
+    return max(0.0, (answered_at - last_review).total_seconds() / 86400)
+
+
+def _nullable(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+import numpy as np
+from app.core.metrics import timed
+from app.services.srs_service import SRSService, SRSBatch
+
+
+@dataclass
+class CardStates:
+    """
+    Состояния карточек в виде массивов одинаковой длины.
+
+    ease_factor/interval/repetitions — поля SM-2, stability/difficulty — поля FSRS
+    (NaN, пока карточку не вёл FSRS). Каждый планировщик обновляет свои поля,
+    а чужие переносит как есть, поэтому колоду можно переключать между ними.
+    """
+    ease_factor: np.ndarray
+    interval: np.ndarray
+    repetitions: np.ndarray
+    stability: np.ndarray
+    difficulty: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows) -> "CardStates":
+        """Собирает массивы из строк с колонками карточки (None -> NaN)"""
+        return cls(
+            ease_factor=np.array([row.ease_factor for row in rows], dtype=np.float64),
+            interval=np.array([row.interval for row in rows], dtype=np.int64),
+            repetitions=np.array([row.repetitions for row in rows], dtype=np.int64),
+            stability=np.array([row.stability for row in rows], dtype=np.float64),
+            difficulty=np.array([row.difficulty for row in rows], dtype=np.float64),
+        )
+
+    def take(self, slots: np.ndarray) -> "CardStates":
+        return CardStates(
+            ease_factor=self.ease_factor[slots],
+            interval=self.interval[slots],
+            repetitions=self.repetitions[slots],
+            stability=self.stability[slots],
+            difficulty=self.difficulty[slots],
+        )
+
+    def put(self, slots: np.ndarray, states: "CardStates"):
+        self.ease_factor[slots] = states.ease_factor
+        self.interval[slots] = states.interval
+        self.repetitions[slots] = states.repetitions
+        self.stability[slots] = states.stability
+        self.difficulty[slots] = states.difficulty
+
+
+class Scheduler:
+    """Планировщик повторений: все методы работают сразу с массивами карточек"""
+
+    name: str
+
+    def review(self, quality: np.ndarray, states: CardStates, elapsed_days: np.ndarray) -> CardStates:
+        """Новые состояния после ответов quality (0-5) через elapsed_days после прошлого показа"""
+        raise NotImplementedError
+
+    def reschedule(self, states: CardStates) -> CardStates:
+        """Пересчитывает интервалы без нового ответа (смена планировщика или его параметров)"""
+        raise NotImplementedError
+
+    def retrievability(self, states: CardStates, elapsed_days: np.ndarray) -> np.ndarray:
+        """Вероятность вспомнить карточку через elapsed_days после прошлого показа"""
+        raise NotImplementedError
+
+
+# Кривая забывания FSRS: R(t, S) = (1 + FACTOR * t / S) ^ DECAY, R(S, S) = 0.9
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1
+
+
+def _forgetting_curve(elapsed_days: np.ndarray, stability: np.ndarray) -> np.ndarray:
+    return (1 + FACTOR * elapsed_days / stability) ** DECAY
+
+
+class SM2Scheduler(Scheduler):
+    """Классический SM-2 (формулы — в SRSService.calculate_next_reviews)"""
+
+    name = "sm2"
+
+    @timed("scheduler_sm2")
+    def review(self, quality: np.ndarray, states: CardStates, elapsed_days: np.ndarray) -> CardStates:
+        reviewed = SRSService.calculate_next_reviews(
+            quality,
+            SRSBatch(ease_factor=states.ease_factor, interval=states.interval, repetitions=states.repetitions)
+        )
+        return CardStates(
+            ease_factor=reviewed.ease_factor,
+            interval=reviewed.interval,
+            repetitions=reviewed.repetitions,
+            stability=states.stability.copy(),
+            difficulty=states.difficulty.copy(),
+        )
+
+    def reschedule(self, states: CardStates) -> CardStates:
+        # У SM-2 нет параметров: интервал и есть всё состояние карточки
+        return states
+
+    def retrievability(self, states: CardStates, elapsed_days: np.ndarray) -> np.ndarray:
+        # SM-2 не моделирует память; считаем, что интервал рассчитан на ~90% припоминания
+        return _forgetting_curve(elapsed_days, np.maximum(states.interval, 1))
+
+
+# Параметры FSRS-4.5 по умолчанию (обучены на открытых логах Anki)
+FSRS_DEFAULT_WEIGHTS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)
+
+
+class FSRSScheduler(Scheduler):
+    """FSRS-4.5: модель памяти со стабильностью и сложностью карточки"""
+
+    name = "fsrs"
+
+    def __init__(
+            self,
+            weights: tuple = FSRS_DEFAULT_WEIGHTS,
+            desired_retention: float = 0.9,
+            maximum_interval: int = 36500
+    ):
+        self.w = np.asarray(weights, dtype=np.float64)
+        self.desired_retention = desired_retention
+        self.maximum_interval = maximum_interval
+
+    @staticmethod
+    def grade(quality: np.ndarray) -> np.ndarray:
+        """Оценка SM-2 (0-5) -> оценка FSRS: 1 Again, 2 Hard, 3 Good, 4 Easy"""
+        return np.clip(np.asarray(quality, dtype=np.int64) - 1, 1, 4)
+
+    def next_interval(self, stability: np.ndarray) -> np.ndarray:
+        interval = stability / FACTOR * (self.desired_retention ** (1 / DECAY) - 1)
+        return np.clip(np.rint(interval), 1, self.maximum_interval).astype(np.int64)
+
+    def _initial_difficulty(self, grade: np.ndarray) -> np.ndarray:
+        return np.clip(self.w[4] - (grade - 3) * self.w[5], 1, 10)
+
+    @timed("scheduler_fsrs")
+    def review(self, quality: np.ndarray, states: CardStates, elapsed_days: np.ndarray) -> CardStates:
+        w = self.w
+        grade = self.grade(quality)
+        recalled = grade > 1
+        first = np.isnan(states.stability)
+
+        # Первый показ под FSRS: начальные стабильность и сложность зависят только от оценки
+        stability = np.where(first, 1.0, states.stability)
+        difficulty = np.where(first, 5.0, states.difficulty)
+        retrievability = _forgetting_curve(np.maximum(elapsed_days, 0), stability)
+
+        next_difficulty = difficulty - w[6] * (grade - 3)
+        next_difficulty = np.clip(w[7] * self._initial_difficulty(3) + (1 - w[7]) * next_difficulty, 1, 10)
+
+        hard_penalty = np.where(grade == 2, w[15], 1.0)
+        easy_bonus = np.where(grade == 4, w[16], 1.0)
+        recall_stability = stability * (
+            1 + np.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+            * np.expm1(w[10] * (1 - retrievability)) * hard_penalty * easy_bonus
+        )
+        forget_stability = (
+            w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * np.exp(w[14] * (1 - retrievability))
+        )
+        # После забывания стабильность не может вырасти
+        forget_stability = np.minimum(forget_stability, stability)
+
+        new_stability = np.where(
+            first,
+            w[grade - 1],
+            np.where(recalled, recall_stability, forget_stability)
+        )
+        new_difficulty = np.where(first, self._initial_difficulty(grade), next_difficulty)
+
+        return CardStates(
+            ease_factor=states.ease_factor.copy(),
+            interval=self.next_interval(new_stability),
+            repetitions=np.where(recalled, states.repetitions + 1, 0),
+            stability=new_stability,
+            difficulty=new_difficulty,
+        )
+
+    def reschedule(self, states: CardStates) -> CardStates:
+        stability = states.stability.copy()
+        difficulty = states.difficulty.copy()
+        # Карточки, которые вёл SM-2: интервал SM-2 принимаем за стабильность,
+        # а ease_factor (1.3..2.5+) переводим в сложность (10..5 и ниже)
+        converted = np.isnan(stability) & (states.interval > 0)
+        stability[converted] = states.interval[converted]
+        difficulty[converted] = np.clip(10 - (states.ease_factor[converted] - 1.3) / 1.2 * 5, 1, 10)
+
+        known = ~np.isnan(stability)
+        interval = states.interval.copy()
+        interval[known] = self.next_interval(stability[known])
+        return CardStates(
+            ease_factor=states.ease_factor.copy(),
+            interval=interval,
+            repetitions=states.repetitions.copy(),
+            stability=stability,
+            difficulty=difficulty,
+        )
+
+    def retrievability(self, states: CardStates, elapsed_days: np.ndarray) -> np.ndarray:
+        stability = np.where(np.isnan(states.stability), np.maximum(states.interval, 1), states.stability)
+        return _forgetting_curve(elapsed_days, stability)
+
+
+SCHEDULERS = ("sm2", "fsrs")
+
+
+def get_scheduler(name: str | None, desired_retention: float | None = None) -> Scheduler:
+    """Планировщик колоды по имени"""
+    if name == "fsrs":
+        return FSRSScheduler(desired_retention=desired_retention or 0.9)
+    return SM2Scheduler()
@@ -0,0 +1,109 @@
+import re
+from typing import NamedTuple
+from sqlalchemy import column, func, literal_column, select, table, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.api.pagination import decode_cursor
+
+# Слова запроса: буквы и цифры любого алфавита. Кавычки, двоеточия и операторы
+# отбрасываются, поэтому запрос пользователя не может изменить синтаксис поиска
+_WORD = re.compile(r"\w+")
+MAX_TERMS = 16
+
+# Вес вопроса относительно ответа в bm25() FTS5 (в Postgres — веса A и B tsvector)
+QUESTION_WEIGHT = 2.0
+ANSWER_WEIGHT = 1.0
+
+_cards_fts = table("cards_fts", column("rowid"), column("question"), column("answer"), column("scope"))
+
+
+class SearchHit(NamedTuple):
+    id: int
+    deck_id: int
+    question: str
+    answer: str
+    rank: float
+
+
+def search_terms(q: str) -> list[str]:
+    return _WORD.findall(q.lower())[:MAX_TERMS]
+
+
+def _sqlite_ranked(user_id: int, deck_id: int | None, terms: list[str]):
+    """FTS5: пользователь и колода — токены колонки scope, последнее слово ищется по префиксу"""
+    # По одной букве префиксом не ищем: под него попадает почти вся коллекция
+    last = f'"{terms[-1]}"*' if len(terms[-1]) > 1 else f'"{terms[-1]}"'
+    words = [f'"{term}"' for term in terms[:-1]] + [last]
+    scope = f"u{user_id}" if deck_id is None else f"u{user_id} AND scope:d{deck_id}"
+    match = f"scope:{scope} AND {{question answer}}:({' AND '.join(words)})"
+    # bm25() FTS5 отрицательный: меньше — релевантнее
+    rank = func.bm25(literal_column("cards_fts"), QUESTION_WEIGHT, ANSWER_WEIGHT, 0.0)
+    return (
+        select(
+            _cards_fts.c.rowid.label("id"),
+            _cards_fts.c.scope,
+            _cards_fts.c.question,
+            _cards_fts.c.answer,
+            rank.label("rank")
+        )
+        .where(literal_column("cards_fts").op("MATCH")(match))
+        .subquery()
+    )
+
+
+def _postgres_ranked(user_id: int, deck_id: int | None, terms: list[str]):
+    """tsvector + GIN: пользователь — через колоду, последнее слово ищется по префиксу"""
+    tsquery = func.to_tsquery("simple", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+    vector = literal_column("cards.search_vector")
+    query = (
+        select(
+            models.Card.id,
+            models.Card.deck_id,
+            models.Card.question,
+            models.Card.answer,
+            # Со знаком минус, как у bm25() в SQLite: меньше — релевантнее
+            (-func.ts_rank(vector, tsquery)).label("rank")
+        )
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Deck.user_id == user_id, vector.op("@@")(tsquery))
+    )
+    if deck_id is not None:
+        query = query.where(models.Card.deck_id == deck_id)
+    return query.subquery()
+
+
+async def search_cards(
+        db: AsyncSession,
+        user_id: int,
+        q: str,
+        limit: int,
+        cursor: str | None = None,
+        deck_id: int | None = None
+) -> list[SearchHit]:
+    """
+    Карточки пользователя, подходящие под запрос, по релевантности.
+
+    Ранг считает сам индекс (bm25() в FTS5, ts_rank в Postgres) по всем совпадениям,
+    страницы идут по (rank, id). Ранг зависит от статистики всей коллекции, поэтому
+    запись между запросами страниц может немного сдвинуть порядок.
+    Возвращает до limit + 1 строк: лишняя означает, что есть следующая страница.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    postgres = db.bind.dialect.name == "postgresql"
+    ranked = _postgres_ranked(user_id, deck_id, terms) if postgres else _sqlite_ranked(user_id, deck_id, terms)
+    query = select(ranked).order_by(ranked.c.rank, ranked.c.id).limit(limit + 1)
+    if cursor is not None:
+        after_rank, after_id = decode_cursor(cursor, float, int)
+        query = query.where(tuple_(ranked.c.rank, ranked.c.id) > tuple_(after_rank, after_id))
+
+    rows = (await db.execute(query)).all()
+    if postgres:
+        return [SearchHit(*row) for row in rows]
+    # scope — «u<user> d<deck>»
+    return [
+        SearchHit(row.id, int(row.scope.split()[1][1:]), row.question, row.answer, row.rank)
+        for row in rows
+    ]
@@ -1,6 +1,14 @@
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import Optional
+import numpy as np
+from app.core.metrics import timed
+
+# Разброс интервала (как в Anki): доля от части интервала в каждом диапазоне дней.
+# Короткие интервалы (меньше 2.5 дней) не размываются.
+FUZZ_RANGES = ((2.5, 7.0, 0.15), (7.0, 20.0, 0.1), (20.0, np.inf, 0.05))
+# Один генератор на процесс: default_rng() на каждый вызов дороже самого SM-2
+_rng = np.random.default_rng()
 
 @dataclass
 class SRSReview:
@@ -9,10 +17,19 @@ class SRSReview:
     repetitions: int = 0
     next_review: Optional[datetime] = None
 
+
+@dataclass
+class SRSBatch:
+    """Состояния SM-2 для пачки карточек в виде массивов одинаковой длины"""
+    ease_factor: np.ndarray
+    interval: np.ndarray
+    repetitions: np.ndarray
+
 class SRSService:
     """Сервис для алгоритма интервального повторения SM-2"""
     
     @staticmethod
+    @timed("srs_calculate_next_review")
     def calculate_next_review(quality: int, current_review: SRSReview) -> SRSReview:
         """
         Алгоритм SM-2 для расчета следующего повторения
@@ -46,10 +63,65 @@ class SRSService:
         current_review.ease_factor = max(1.3, current_review.ease_factor)
         
         # Расчет следующего повторения
-        current_review.next_review = datetime.now() + timedelta(days=current_review.interval)
+        current_review.next_review = datetime.utcnow() + timedelta(days=current_review.interval)
         
         return current_review
+
+    @staticmethod
+    def calculate_next_reviews(quality: np.ndarray, batch: SRSBatch) -> SRSBatch:
+        """
+        Векторизованный SM-2: один проход по массивам вместо цикла по карточкам.
+
+        Формулы совпадают с calculate_next_review; дату следующего показа
+        вызывающий код считает сам от времени ответа.
+        """
+        quality = np.asarray(quality, dtype=np.int64)
+        ease_factor = np.asarray(batch.ease_factor, dtype=np.float64)
+        interval = np.asarray(batch.interval, dtype=np.int64)
+        repetitions = np.asarray(batch.repetitions, dtype=np.int64)
+
+        correct = quality >= 3
+        # np.rint, как и round(), округляет половины к чётному
+        grown = np.where(
+            repetitions == 0, 1,
+            np.where(repetitions == 1, 6, np.rint(interval * ease_factor))
+        )
+        new_interval = np.where(correct, grown, 1).astype(np.int64)
+        new_repetitions = np.where(correct, repetitions + 1, 0)
+
+        penalty = 5 - quality
+        new_ease_factor = np.maximum(1.3, ease_factor + (0.1 - penalty * (0.08 + penalty * 0.02)))
+
+        return SRSBatch(
+            ease_factor=new_ease_factor,
+            interval=new_interval,
+            repetitions=new_repetitions
+        )
     
+    @staticmethod
+    def fuzz_range(interval: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Допустимые интервалы [low, high] в днях вокруг interval"""
+        interval = np.asarray(interval, dtype=np.float64)
+        delta = np.ones_like(interval)
+        for start, end, factor in FUZZ_RANGES:
+            delta += factor * np.clip(np.minimum(interval, end) - start, 0, None)
+        fuzzable = interval >= FUZZ_RANGES[0][0]
+        low = np.where(fuzzable, np.maximum(2, np.rint(interval - delta)), interval).astype(np.int64)
+        high = np.where(fuzzable, np.rint(interval + delta), interval).astype(np.int64)
+        return low, np.maximum(low, high)
+
+    @staticmethod
+    def rng() -> np.random.Generator:
+        """Общий генератор процесса для разброса интервалов"""
+        return _rng
+
+    @staticmethod
+    def fuzz(interval: np.ndarray, rng: np.random.Generator | None = None) -> np.ndarray:
+        """Случайный интервал из fuzz_range — карточки одного дня расходятся по соседним дням"""
+        low, high = SRSService.fuzz_range(interval)
+        rng = rng or _rng
+        return rng.integers(low, high + 1)
+
     @staticmethod
     def get_default_review() -> SRSReview:
         """Возвращает настройки по умолчанию для новой карточки"""
@@ -57,5 +129,5 @@ class SRSService:
             ease_factor=2.5,
             interval=0,
             repetitions=0,
-            next_review=datetime.now()
+            next_review=datetime.utcnow()
         )
@@ -0,0 +1,221 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.api.pagination import decode_cursor
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.write_queue import write_queue
+
+# Как часто (секунды) последняя страница очереди проверяет, не пора ли её построить
+# или дополнить: карточки, добавленные в течение дня, попадут в очередь без rebuild
+BUILD_RECHECK = 60
+
+
+def _interleave(reviews: list[int], new: list[int]) -> list[tuple[int, bool]]:
+    """Равномерно вставляет новые карточки между повторениями"""
+    keyed = [((index + 0.5) / len(reviews), card_id, False) for index, card_id in enumerate(reviews)]
+    keyed += [((index + 0.5) / len(new), card_id, True) for index, card_id in enumerate(new)]
+    return [(card_id, is_new) for _, card_id, is_new in sorted(keyed, key=lambda item: item[0])]
+
+
+class StudyQueueService:
+    """
+    Дневная очередь занятий пользователя.
+
+    Строится один раз в день (UTC): до daily_limit карточек к повторению и новых
+    в доле new_ratio, колоды чередуются. Дальше страницы читаются из таблицы
+    study_queue по позиции — без сортировки всех просроченных карточек на каждый запрос.
+    Карточки, появившиеся за день, дописываются в конец очереди в пределах того же лимита.
+    """
+
+    def __init__(self, daily_limit: int, new_ratio: float):
+        self.daily_limit = daily_limit
+        self.new_ratio = new_ratio
+        # (user_id, day), для которых недавно проверяли, нужна ли постройка
+        self._checked = TTLCache(ttl=BUILD_RECHECK)
+
+    @staticmethod
+    def today() -> date:
+        return datetime.utcnow().date()
+
+    async def page(
+            self,
+            db: AsyncSession,
+            user_id: int,
+            limit: int,
+            cursor: str | None = None
+    ) -> list:
+        """
+        Страница сегодняшней очереди: до limit + 1 строк (id, question, answer, deck_id, position, is_new).
+
+        Уже отвеченные карточки (next_review ушёл за конец дня) и удалённые пропускаются.
+        Курсор со вчерашнего дня начинает очередь заново.
+        """
+        day = self.today()
+        after = 0
+        if cursor is not None:
+            cursor_day, position = decode_cursor(cursor, str, int)
+            if cursor_day == day.isoformat():
+                after = position
+
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        query = (
+            select(
+                models.Card.id,
+                models.Card.question,
+                models.Card.answer,
+                models.Card.deck_id,
+                models.StudyQueueItem.position,
+                models.StudyQueueItem.is_new
+            )
+            .select_from(models.StudyQueueItem)
+            .join(models.Card, models.Card.id == models.StudyQueueItem.card_id)
+            .join(models.Deck, models.Deck.id == models.Card.deck_id)
+            .where(
+                models.StudyQueueItem.user_id == user_id,
+                models.StudyQueueItem.day == day,
+                models.StudyQueueItem.position > after,
+                models.Deck.user_id == user_id,
+                models.Card.next_review < end
+            )
+            .order_by(models.StudyQueueItem.position)
+            .limit(limit + 1)
+        )
+        rows = (await db.execute(query)).all()
+        # Дошли до конца очереди — возможно, её ещё нет или появились новые карточки
+        if len(rows) <= limit and await self._needs_build(db, user_id, day):
+            if await self.build(user_id, day):
+                rows = (await db.execute(query)).all()
+        return rows
+
+    async def _needs_build(self, db: AsyncSession, user_id: int, day: date) -> bool:
+        """
+        Очереди на день ещё нет или в неё можно дописать карточки. Последние страницы
+        не ставят задание в очередь записи: проверка — чтение, и не чаще раза в BUILD_RECHECK
+        """
+        key = (user_id, day)
+        if self._checked.get(key):
+            return False
+        self._checked.set(key, True)
+        queued = await db.scalar(select(func.count()).where(
+            models.StudyQueueItem.user_id == user_id, models.StudyQueueItem.day == day
+        ))
+        if queued >= self.daily_limit:
+            return False
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        return await db.scalar(
+            select(models.Card.id)
+            .join(models.Deck, models.Deck.id == models.Card.deck_id)
+            .where(
+                models.Deck.user_id == user_id,
+                or_(self._new_condition(), self._review_condition(end)),
+                self._not_queued(user_id, day)
+            )
+            .limit(1)
+        ) is not None
+
+    @staticmethod
+    def _new_condition():
+        return and_(models.Card.last_review.is_(None), models.Card.repetitions == 0)
+
+    @staticmethod
+    def _review_condition(end: datetime):
+        return and_(
+            or_(models.Card.last_review.is_not(None), models.Card.repetitions > 0),
+            models.Card.next_review < end
+        )
+
+    @staticmethod
+    def _not_queued(user_id: int, day: date):
+        return ~select(models.StudyQueueItem.card_id).where(
+            models.StudyQueueItem.user_id == user_id,
+            models.StudyQueueItem.day == day,
+            models.StudyQueueItem.card_id == models.Card.id
+        ).exists()
+
+    async def build(self, user_id: int, day: date | None = None, rebuild: bool = False) -> bool:
+        """
+        Строит очередь на день, а если она уже есть — дописывает в конец карточки,
+        которых в ней нет, пока не набран daily_limit. True — если что-то добавлено
+        """
+        day = day or self.today()
+
+        async def job(db: AsyncSession) -> bool:
+            if rebuild:
+                await db.execute(delete(models.StudyQueueItem).where(
+                    models.StudyQueueItem.user_id == user_id, models.StudyQueueItem.day == day
+                ))
+            queued, queued_new, last_position = (await db.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(case((models.StudyQueueItem.is_new, 1), else_=0)), 0),
+                    func.coalesce(func.max(models.StudyQueueItem.position), 0)
+                )
+                .where(models.StudyQueueItem.user_id == user_id, models.StudyQueueItem.day == day)
+            )).one()
+            if queued >= self.daily_limit:
+                return False
+
+            if not queued:
+                # Очереди прошлых дней больше не читаются
+                await db.execute(delete(models.StudyQueueItem).where(
+                    models.StudyQueueItem.user_id == user_id, models.StudyQueueItem.day < day
+                ))
+
+            end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+            not_queued = self._not_queued(user_id, day)
+            new = await self._pick(
+                db, user_id,
+                and_(self._new_condition(), not_queued),
+                models.Card.id,
+                min(self.daily_limit - queued, round(self.daily_limit * self.new_ratio) - queued_new)
+            )
+            # Если новых меньше доли, освободившиеся места отдаются повторениям
+            reviews = await self._pick(
+                db, user_id,
+                and_(self._review_condition(end), not_queued),
+                models.Card.next_review,
+                self.daily_limit - queued - len(new)
+            )
+            items = [
+                {"user_id": user_id, "day": day, "position": position, "card_id": card_id, "is_new": is_new}
+                for position, (card_id, is_new) in enumerate(_interleave(reviews, new), start=last_position + 1)
+            ]
+            if items:
+                await db.execute(insert(models.StudyQueueItem), items)
+            return bool(items)
+
+        try:
+            return await write_queue.submit(job)
+        except IntegrityError:
+            # Очередь на этот день параллельно построил или дополнил другой запрос
+            return False
+
+    @staticmethod
+    async def _pick(db: AsyncSession, user_id: int, condition, order, limit: int) -> list[int]:
+        """
+        До limit карточек с чередованием колод: сначала первая карточка каждой колоды,
+        потом вторая и т. д.; внутри колоды — по order
+        """
+        if limit <= 0:
+            return []
+        turn = func.row_number().over(
+            partition_by=models.Card.deck_id, order_by=(order, models.Card.id)
+        ).label("turn")
+        ranked = (
+            select(models.Card.id, models.Card.deck_id, turn)
+            .join(models.Deck, models.Deck.id == models.Card.deck_id)
+            .where(models.Deck.user_id == user_id, condition)
+            .subquery()
+        )
+        return list(await db.scalars(
+            select(ranked.c.id).order_by(ranked.c.turn, ranked.c.deck_id).limit(limit)
+        ))
+
+
+study_queue_service = StudyQueueService(
+    daily_limit=settings.STUDY_DAILY_LIMIT,
+    new_ratio=settings.STUDY_NEW_RATIO
+)
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.schemas.sync import SyncChanges, SyncCreated, SyncUpload, SyncUploadResult
+from app.services.media_store import media_store
+from app.services.review_service import apply_reviews
+from app.services.write_queue import write_queue
+
+# Курсор «с самого начала» для первой синхронизации
+_EPOCH = datetime(1970, 1, 1)
+
+
+def add_tombstones(db: AsyncSession, user_id: int, entity: str, entity_ids: list[int]):
+    """Запоминает удаление, чтобы оно дошло до клиентов через GET /sync"""
+    now = datetime.utcnow()
+    db.add_all(
+        models.Tombstone(user_id=user_id, entity=entity, entity_id=entity_id, deleted_at=now)
+        for entity_id in entity_ids
+    )
+
+
+def _after(updated_at_column, id_column, updated_at: datetime, last_id: int):
+    """Строго после (updated_at, id) — keyset по составному ключу"""
+    return and_(
+        updated_at_column >= updated_at,
+        or_(updated_at_column > updated_at, and_(updated_at_column == updated_at, id_column > last_id))
+    )
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+async def collect_changes(db: AsyncSession, user_id: int, since: str | None, limit: int) -> SyncChanges:
+    """
+    Колоды, карточки и удаления пользователя после курсора.
+
+    Курсор хранит позицию в каждом из трёх потоков: (updated_at, id) колод и карточек
+    и id надгробия. Курсор не заходит дальше начала самой старой открытой транзакции
+    записи: её строки получат updated_at раньше, чем закоммитятся. SYNC_LAG — запас
+    на расхождение часов и на время между вычислением updated_at и началом транзакции.
+    """
+    if since is not None:
+        deck_at, deck_id, card_at, card_id, tombstone_id = decode_cursor(since, datetime, int, datetime, int, int)
+    else:
+        deck_at, deck_id, card_at, card_id = _EPOCH, 0, _EPOCH, 0
+        # Первой синхронизации удаления не нужны — клиент получает всё актуальное
+        tombstone_id = await db.scalar(
+            select(func.coalesce(func.max(models.Tombstone.id), 0)).where(models.Tombstone.user_id == user_id)
+        )
+    upper = datetime.utcnow()
+    oldest_write = await write_queue.oldest_open_write(db)
+    if oldest_write is not None:
+        upper = min(upper, oldest_write)
+    upper -= timedelta(seconds=settings.SYNC_LAG)
+
+    decks = (await db.scalars(
+        select(models.Deck)
+        .where(
+            models.Deck.user_id == user_id,
+            models.Deck.updated_at <= upper,
+            _after(models.Deck.updated_at, models.Deck.id, deck_at, deck_id)
+        )
+        .order_by(models.Deck.updated_at, models.Deck.id)
+        .limit(limit + 1)
+    )).all()
+
+    cards = (await db.scalars(
+        select(models.Card)
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(
+            models.Deck.user_id == user_id,
+            models.Card.updated_at <= upper,
+            _after(models.Card.updated_at, models.Card.id, card_at, card_id)
+        )
+        .order_by(models.Card.updated_at, models.Card.id)
+        .limit(limit + 1)
+    )).all()
+
+    tombstones = (await db.scalars(
+        select(models.Tombstone)
+        .where(
+            models.Tombstone.user_id == user_id,
+            models.Tombstone.id > tombstone_id,
+            models.Tombstone.deleted_at <= upper
+        )
+        .order_by(models.Tombstone.id)
+        .limit(limit + 1)
+    )).all()
+
+    has_more = len(decks) > limit or len(cards) > limit or len(tombstones) > limit
+    decks, cards, tombstones = decks[:limit], cards[:limit], tombstones[:limit]
+    if decks:
+        deck_at, deck_id = decks[-1].updated_at, decks[-1].id
+    if cards:
+        card_at, card_id = cards[-1].updated_at, cards[-1].id
+    if tombstones:
+        tombstone_id = tombstones[-1].id
+
+    return SyncChanges(
+        decks=decks,
+        cards=cards,
+        deleted_decks=[item.entity_id for item in tombstones if item.entity == "deck"],
+        deleted_cards=[item.entity_id for item in tombstones if item.entity == "card"],
+        cursor=encode_cursor(deck_at, deck_id, card_at, card_id, tombstone_id),
+        has_more=has_more
+    )
+
+
+async def apply_upload(db: AsyncSession, user_id: int, upload: SyncUpload) -> tuple[SyncUploadResult, set, list]:
+    """
+    Применяет офлайн-правки клиента одной транзакцией.
+
+    Возвращает результат, затронутые колоды и медиафайлы, которые нужно удалить после коммита.
+    """
+    result = SyncUploadResult(created=[], reviews=[], conflicts=[], missing=[])
+    touched_decks = set()
+
+    # Новые карточки: только в свои колоды
+    deck_ids = {item.deck_id for item in upload.created_cards}
+    owned_decks = set((await db.scalars(
+        select(models.Deck.id).where(models.Deck.id.in_(deck_ids), models.Deck.user_id == user_id)
+    )).all()) if deck_ids else set()
+    now = datetime.utcnow()
+    created = []
+    for item in upload.created_cards:
+        if item.deck_id not in owned_decks:
+            result.missing.append(item.deck_id)
+            continue
+        card = models.Card(
+            question=item.question,
+            answer=item.answer,
+            deck_id=item.deck_id,
+            ease_factor=2.5,
+            interval=0,
+            repetitions=0,
+            next_review=now
+        )
+        db.add(card)
+        created.append((item.client_id, card))
+        touched_decks.add(item.deck_id)
+    await db.flush()
+    result.created = [SyncCreated(client_id=client_id, id=card.id) for client_id, card in created]
+
+    # Карточки, которые клиент правит, удаляет или повторял, — одной выборкой
+    card_ids = (
+        {item.id for item in upload.updated_cards}
+        | set(upload.deleted_cards)
+        | {item.card_id for item in upload.reviews}
+    )
+    cards = {card.id: card for card in (await db.scalars(
+        select(models.Card)
+        .join(models.Deck, models.Deck.id == models.Card.deck_id)
+        .where(models.Card.id.in_(card_ids), models.Deck.user_id == user_id)
+    )).all()} if card_ids else {}
+
+    orphans = []
+    for item in upload.updated_cards:
+        card = cards.get(item.id)
+        if card is None:
+            result.missing.append(item.id)
+            continue
+        # Карточку уже изменили на сервере (другое устройство) — не затираем молча
+        if card.updated_at > _naive_utc(item.base_updated_at):
+            result.conflicts.append(item.id)
+            continue
+        stale_audio = []
+        if item.question is not None and item.question != card.question:
+            card.question = item.question
+            stale_audio.append("question_audio_url")
+        if item.answer is not None and item.answer != card.answer:
+            card.answer = item.answer
+            stale_audio.append("answer_audio_url")
+        orphans += await media_store.clear_audio(db, card, *stale_audio)
+        touched_decks.add(card.deck_id)
+
+    deleted = [card_id for card_id in dict.fromkeys(upload.deleted_cards) if card_id in cards]
+    result.missing.extend(card_id for card_id in upload.deleted_cards if card_id not in cards)
+    if deleted:
+        orphans += await media_store.release_cards(db, deleted)
+        for card_id in deleted:
+            touched_decks.add(cards[card_id].deck_id)
+            await db.delete(cards[card_id])
+        add_tombstones(db, user_id, "card", deleted)
+    await db.flush()
+
+    # Ответы по карточкам, которых уже нет, пропускаем, а не роняем всю синхронизацию
+    alive = cards.keys() - set(deleted)
+    reviews = [item for item in upload.reviews if item.card_id in alive]
+    result.missing.extend(item.card_id for item in upload.reviews if item.card_id not in alive)
+    if reviews:
+        result.reviews = await apply_reviews(db, reviews, user_id=user_id)
+        touched_decks.update(cards[item.card_id].deck_id for item in reviews)
+
+    result.missing = list(dict.fromkeys(result.missing))
+    return result, touched_decks, orphans
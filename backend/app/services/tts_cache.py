@@ -0,0 +1,217 @@
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import Collected, registry
+from app.services.media_store import StoredBlob, media_store
+
+# Журнал не переписывается в индекс, пока в нём меньше записей, чем это число
+# (или чем записей в самом индексе)
+JOURNAL_COMPACT_MIN = 1000
+
+
+@dataclass
+class CacheEntry:
+    name: str   # имя блоба в MediaStore
+    size: int
+
+
+class TTSCache:
+    """
+    Дисковый кэш синтеза речи с LRU-индексом в памяти и вытеснением по размеру.
+
+    На диске индекс — снимок (JSON) и журнал изменений рядом с ним: промах дописывает
+    в журнал одну строку, а снимок переписывается, только когда журнал разрастается.
+    """
+
+    def __init__(self, index_path: str, max_bytes: int):
+        self.index_path = index_path
+        self.journal_path = f"{index_path}.journal"
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._journal_records = 0
+        self._write_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        # Синтезы в процессе: одинаковые запросы ждут одну и ту же задачу
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def make_key(backend: str, text: str, language_code: str, voice: str | None, audio_config: dict) -> str:
+        """Ключ кэша: хэш нормализованного текста и всех параметров синтеза"""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        payload = json.dumps(
+            [backend, normalized, language_code, voice, audio_config],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """Возвращает URL готового аудио или None"""
+        await self._ensure_loaded()
+        entry = self._entries.get(key)
+        if entry is not None and os.path.exists(media_store.blob_path(entry.name)):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return media_store.blob_url(entry.name)
+
+        if entry is not None:
+            # Файл удалили вместе с последней карточкой — считаем промахом
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, blob: StoredBlob):
+        """Запоминает результат синтеза и вытесняет самые старые записи сверх лимита"""
+        await self._ensure_loaded()
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = CacheEntry(name=blob.name, size=blob.size)
+        self._total_bytes += blob.size
+
+        records = [[key, blob.name, blob.size]]
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, _ = next(iter(self._entries.items()))
+            evicted.append(self._drop(old_key).name)
+            records.append([old_key])
+            self.evictions += 1
+
+        # Тот же блоб может оставаться в кэше под другим ключом
+        live = {entry.name for entry in self._entries.values()}
+        await media_store.remove([name for name in evicted if name not in live])
+        await self._write(records)
+
+    async def get_or_create(self, key: str, synthesize: Callable[[], Awaitable[StoredBlob]]) -> str:
+        """Отдаёт аудио из кэша, а при промахе синтезирует и кэширует его"""
+        url = await self.get(key)
+        if url is not None:
+            return url
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._create(key, synthesize))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего клиента не должна обрывать синтез для остальных
+        return await asyncio.shield(task)
+
+    async def _create(self, key: str, synthesize: Callable[[], Awaitable[StoredBlob]]) -> str:
+        blob = await synthesize()
+        await self.put(key, blob)
+        return blob.url
+
+    def stats(self) -> dict:
+        """Метрики кэша: попадания, промахи, вытеснения и занятый объём"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _drop(self, key: str) -> CacheEntry:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        return entry
+
+    async def _ensure_loaded(self):
+        """Поднимает индекс с диска при первом обращении: снимок, затем журнал поверх него"""
+        if self._loaded:
+            return
+        self._loaded = True
+        snapshot, journal = await run_in_threadpool(self._load_index)
+        for key, name, size in snapshot:
+            if key not in self._entries:
+                self._entries[key] = CacheEntry(name=name, size=size)
+                self._total_bytes += size
+        for record in journal:
+            if record[0] in self._entries:
+                self._drop(record[0])
+            if len(record) == 3:
+                key, name, size = record
+                self._entries[key] = CacheEntry(name=name, size=size)
+                self._total_bytes += size
+        self._journal_records = len(journal)
+
+    async def _write(self, records: list):
+        """Дописывает изменения в журнал; разросшийся журнал сворачивается в новый снимок"""
+        async with self._write_lock:
+            self._journal_records += len(records)
+            if self._journal_records > max(len(self._entries), JOURNAL_COMPACT_MIN):
+                await run_in_threadpool(self._save_index, list(self._entries.items()))
+                self._journal_records = 0
+            else:
+                await run_in_threadpool(self._append_journal, records)
+
+    def _load_index(self) -> tuple[list, list]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, ValueError):
+            snapshot = []
+        journal = []
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        journal.append(json.loads(line))
+                    except ValueError:
+                        # Строка, недописанная при падении процесса
+                        break
+        except FileNotFoundError:
+            pass
+        return snapshot, journal
+
+    def _append_journal(self, records: list):
+        """Записи журнала: [key, name, size] — добавление, [key] — вытеснение"""
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def _save_index(self, items: list):
+        """Пишет снимок атомарно (временный файл, затем replace) и очищает журнал"""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        temp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump([[key, entry.name, entry.size] for key, entry in items], f)
+        os.replace(temp_path, self.index_path)
+        # Если упасть до очистки, журнал при загрузке просто повторится поверх снимка
+        open(self.journal_path, "w").close()
+
+
+tts_cache = TTSCache(index_path=settings.TTS_CACHE_INDEX, max_bytes=settings.TTS_CACHE_MAX_BYTES)
+
+# Счётчики кэша в /metrics читаются из tts_cache.stats() в момент выгрузки
+registry.register(Collected(
+    "flashlearn_tts_cache_lookups_total", "Обращения к кэшу TTS по результату", "counter",
+    lambda: {(result,): tts_cache.stats()[key] for result, key in (("hit", "hits"), ("miss", "misses"))},
+    ("result",)
+))
+for _name, _kind, _key, _documentation in (
+        ("flashlearn_tts_cache_coalesced_total", "counter", "coalesced", "Промахи, дождавшиеся уже идущего синтеза"),
+        ("flashlearn_tts_cache_evictions_total", "counter", "evictions", "Записи, вытесненные из кэша TTS по размеру"),
+        ("flashlearn_tts_cache_entries", "gauge", "entries", "Записей в кэше TTS"),
+        ("flashlearn_tts_cache_bytes", "gauge", "bytes", "Объём аудио в кэше TTS, байты"),
+):
+    registry.register(Collected(_name, _documentation, _kind, lambda key=_key: {(): tts_cache.stats()[key]}))
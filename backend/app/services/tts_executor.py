@@ -0,0 +1,34 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+
+
+class TTSExecutor:
+    """Ограниченный пул для блокирующих вызовов синтеза речи"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        # Ждём свободного слота в event loop, а не в очереди пула — так ожидание можно отменить
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pool: ThreadPoolExecutor | None = None
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняет блокирующую функцию в пуле, не больше max_concurrency одновременно"""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="tts")
+        return self._pool
+
+    def close(self):
+        """Останавливает пул (при завершении приложения)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+tts_executor = TTSExecutor(settings.TTS_MAX_CONCURRENCY)
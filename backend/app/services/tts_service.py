@@ -1,41 +1,67 @@
-import os
-import uuid
-from google.cloud import texttospeech
+import asyncio
 from fastapi import HTTPException
-from app.services.file_service import file_service
+from app.core.metrics import timed
+from app.services.media_store import StoredBlob, media_store
+from app.services.tts_cache import tts_cache
+from app.services.tts_executor import tts_executor
 
 class TTSService:
     def __init__(self):
+        # Клиент создаётся при первой озвучке: импорт google.cloud и поиск учётных
+        # данных занимают секунды, а большинству воркеров TTS не нужен вовсе
         self.client = None
-        self._initialize_client()
-    
-    def _initialize_client(self):
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self):
+        """Создаёт клиент Google Cloud TTS один раз (блокирующая часть — в пуле TTS)"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if not self._initialized:
+                self.client = await tts_executor.run(self._initialize_client)
+                self._initialized = True
+
+    @staticmethod
+    def _initialize_client():
         """Инициализирует клиент Google Cloud TTS"""
         try:
+            from google.cloud import texttospeech
+
             # Для работы нужен credentials файл Google Cloud
             # Можно установить переменную окружения GOOGLE_APPLICATION_CREDENTIALS
-            self.client = texttospeech.TextToSpeechClient()
+            return texttospeech.TextToSpeechClient()
         except Exception as e:
             print(f"Предупреждение: Google Cloud TTS не инициализирован: {e}")
-            self.client = None
+            return None
+    
+    async def generate_speech(self, text: str, language_code: str = "ru-RU", voice_name: str | None = None) -> str:
+        """Генерирует аудио из текста (или берёт готовое из кэша) и возвращает путь к файлу"""
+        if len(text) > 5000:
+            raise HTTPException(status_code=400, detail="Текст слишком длинный (макс. 5000 символов)")
+        
+        key = tts_cache.make_key("google", text, language_code, voice_name, {"audio_encoding": "MP3"})
+        return await tts_cache.get_or_create(key, lambda: self._synthesize(text, language_code, voice_name))
     
-    async def generate_speech(self, text: str, language_code: str = "ru-RU") -> str:
-        """Генерирует аудио из текста и возвращает путь к файлу"""
+    @timed("tts_google")
+    async def _synthesize(self, text: str, language_code: str, voice_name: str | None) -> StoredBlob:
+        """Синтезирует речь через Google Cloud и сохраняет результат в хранилище"""
+        await self.initialize()
         if not self.client:
             raise HTTPException(
                 status_code=501, 
                 detail="TTS сервис недоступен. Проверьте настройки Google Cloud."
             )
         
-        if len(text) > 5000:
-            raise HTTPException(status_code=400, detail="Текст слишком длинный (макс. 5000 символов)")
-        
         try:
+            from google.cloud import texttospeech
+
             # Настройка синтеза речи
             synthesis_input = texttospeech.SynthesisInput(text=text)
             
             voice = texttospeech.VoiceSelectionParams(
                 language_code=language_code,
+                name=voice_name,
                 ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
             )
             
@@ -43,27 +69,22 @@ class TTSService:
                 audio_encoding=texttospeech.AudioEncoding.MP3
             )
             
-            # Запрос на синтез речи
-            response = self.client.synthesize_speech(
+            # Запрос на синтез речи: блокирующий gRPC-вызов уходит в ограниченный пул
+            response = await tts_executor.run(
+                self.client.synthesize_speech,
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
             )
             
-            # Сохраняем аудио файл
-            filename = f"{uuid.uuid4()}.mp3"
-            file_path = os.path.join(file_service.audio_dir, filename)
-            
-            with open(file_path, "wb") as out:
-                out.write(response.audio_content)
-            
-            return f"/uploads/audio/{filename}"
+            # Сохраняем аудио в хранилище: одинаковый результат синтеза хранится один раз
+            return await media_store.save_bytes(response.audio_content, "mp3", "audio")
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Ошибка TTS: {str(e)}")
     
     def is_available(self) -> bool:
-        """Проверяет доступность TTS сервиса"""
+        """Проверяет доступность TTS сервиса (после initialize)"""
         return self.client is not None
 
 tts_service = TTSService()
@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import contextvars
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import attribute_to, current_stats
+from app.database import AsyncSessionLocal
+
+# Задание на запись: получает сессию, работает только с ней и возвращает результат.
+# Коммит делает очередь, поэтому внутри задания commit() не вызывается.
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Очередь записей с единственным писателем для SQLite"""
+
+    def __init__(self, enabled: bool, max_batch: int):
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Начало каждой открытой транзакции записи этого процесса (UTC)
+        self._open: dict[object, datetime] = {}
+
+    async def submit(self, job: WriteJob) -> Any:
+        """Выполняет задание на запись и возвращает его результат"""
+        if not self.enabled:
+            # Серверная БД сама справляется с параллельной записью
+            with self._tracked():
+                async with AsyncSessionLocal() as session:
+                    result = await job(session)
+                    await session.commit()
+                    return result
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        # Запросы задания засчитываются HTTP-запросу, который его поставил
+        await self._queue.put((job, future, current_stats()))
+        return await future
+
+    async def oldest_open_write(self, db: AsyncSession) -> datetime | None:
+        """
+        Начало самой старой незакоммиченной транзакции записи (naive UTC) или None.
+
+        Строки, записанные после этого момента, читатель может ещё не видеть, поэтому
+        курсоры по времени и id (синхронизация, свёртка журнала) не заходят дальше него.
+        В SQLite пишет только этот процесс — хватает собственного учёта; в Postgres
+        открытые транзакции всех процессов видны в pg_stat_activity.
+        """
+        if db.bind.dialect.name == "postgresql":
+            started = await db.scalar(text(
+                "SELECT min(xact_start) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+            ))
+            return started.astimezone(timezone.utc).replace(tzinfo=None) if started else None
+        return min(self._open.values(), default=None)
+
+    @contextlib.contextmanager
+    def _tracked(self):
+        """Отмечает транзакцию записи открытой на время блока"""
+        token = object()
+        self._open[token] = datetime.utcnow()
+        try:
+            yield
+        finally:
+            del self._open[token]
+
+    async def close(self):
+        """Останавливает писателя (при завершении приложения)"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        """Запускает писателя в текущем event loop при первом обращении"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Пустой контекст: иначе писатель унаследует контекст запроса, который его запустил
+            self._worker = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        """Забирает накопившиеся задания и выполняет их одной транзакцией"""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._execute(batch)
+
+    async def _execute(self, batch: list):
+        if len(batch) > 1:
+            try:
+                with self._tracked():
+                    async with AsyncSessionLocal() as session:
+                        results = []
+                        for job, _, stats in batch:
+                            with attribute_to(stats):
+                                results.append(await job(session))
+                        await session.commit()
+            except Exception:
+                # Одно упавшее задание не должно откатывать соседние — повторяем по одному
+                pass
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+                return
+
+        for job, future, stats in batch:
+            try:
+                with self._tracked(), attribute_to(stats):
+                    async with AsyncSessionLocal() as session:
+                        result = await job(session)
+                        await session.commit()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+write_queue = WriteQueue(
+    enabled=settings.DATABASE_URL.startswith("sqlite") and settings.SQLITE_WRITE_QUEUE,
+    max_batch=settings.WRITE_QUEUE_MAX_BATCH
+)
@@ -0,0 +1,85 @@
+"""
+Холодный старт воркера: время импорта app.main в свежем интерпретаторе.
+
+Каждый прогон — отдельный процесс `python -X importtime`, поэтому кэш модулей
+не помогает (байткод .pyc при этом используется, как и в проде). Кроме общего
+времени печатаются самые дорогие модули по накопленному времени импорта —
+так видно, что именно вернуло тяжёлую работу в импорт (клиент TTS, create_all…).
+
+С --budget скрипт завершается с кодом 1, если медиана превысила бюджет, —
+годится для проверки регрессий в CI.
+
+Запуск из каталога backend:
+    python -m benchmarks.cold_start --runs 5 --budget 1.5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import print_report, summarize
+
+
+def import_once(module: str, env: dict) -> tuple[float, dict[str, int]]:
+    """Импортирует модуль в новом процессе; возвращает время и накопленное время модулей (мкс)"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise SystemExit(f"Импорт {module} упал:\n{completed.stderr[-2000:]}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return elapsed, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых дорогих модулей показать")
+    parser.add_argument("--budget", type=float, default=None, help="допустимая медиана, секунды")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Отдельная пустая БД: импорт не должен её создавать или трогать
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'cold_start.db')}"}
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+        # Прогрев: компиляция .pyc не должна попадать в замер
+        import_once(args.module, env)
+
+        timings, slowest = [], {}
+        for _ in range(args.runs):
+            elapsed, modules = import_once(args.module, env)
+            timings.append(elapsed)
+            for name, cumulative in modules.items():
+                slowest[name] = max(slowest.get(name, 0), cumulative)
+
+        touched_db = os.path.exists(os.path.join(workdir, "cold_start.db"))
+
+    summary = summarize(timings)
+    print_report(f"import {args.module}", summary)
+    print(f"  БД создана при импорте: {'да' if touched_db else 'нет'}")
+    print(f"  самые дорогие модули (накопленно, мс):")
+    for name, cumulative in sorted(slowest.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"    {cumulative / 1000:9.1f}  {name}")
+
+    if args.budget is not None and summary["p50_ms"] / 1000 > args.budget:
+        print(f"Медиана {summary['p50_ms'] / 1000:.3f} с больше бюджета {args.budget} с")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import asyncio
+import statistics
+import time
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль q (0–100) методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list[float], elapsed: float | None = None) -> dict:
+    """Сводка по задержкам в секундах: p50/p95/p99, среднее и RPS"""
+    summary = {
+        "count": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    if elapsed:
+        summary["rps"] = len(latencies) / elapsed
+    return summary
+
+
+def print_report(title: str, summary: dict):
+    """Печатает сводку одной строкой"""
+    parts = [f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+             for key, value in summary.items()]
+    print(f"{title:<32} " + "  ".join(parts))
+
+
+async def probe(stop: asyncio.Event, lags: list[float], period: float = 0.005):
+    """Меряет, насколько event loop опаздывает с пробуждением"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append(max(0.0, time.perf_counter() - start - period))
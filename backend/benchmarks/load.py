@@ -0,0 +1,210 @@
+"""
+Нагрузочный прогон API: виртуальные пользователи гоняют типовые сценарии.
+
+Сценарии:
+  review  — цикл занятий: GET /cards/review (20 карточек), затем POST /cards/review/batch;
+  decks   — список колод;
+  login   — вход (bcrypt на сервере);
+  upload  — загрузка небольшого изображения к карточке;
+  mixed   — всё вместе: 70% review, 20% decks, 5% upload, 5% login.
+
+Без --base-url приложение поднимается в этом же процессе через httpx.ASGITransport:
+сеть не нужна, но клиент и сервер делят один event loop и одно ядро, поэтому
+абсолютные цифры ниже, чем у отдельного uvicorn, — сравнивать стоит прогоны между собой.
+Загрузки при этом пишутся во временный каталог, а не в uploads/ рабочей копии.
+С --base-url нагрузка идёт на уже запущенный сервер.
+
+Данные — из benchmarks.seed (пользователи bench0…). Для сравнения SQLite и Postgres
+один и тот же прогон запускается дважды с разными --database-url (и seed перед каждым).
+
+Для каждого запроса печатаются p50/p95/p99, среднее и RPS, плюс число ошибок.
+
+Запуск из каталога backend:
+    python -m benchmarks.seed --users 20
+    python -m benchmarks.load --scenario mixed --users 20 --concurrency 32 --duration 30
+    python -m benchmarks.load --scenario review --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import print_report, summarize
+from benchmarks.seed import PASSWORD, USERNAME
+
+API = "/api/v1"
+MIX = (("review", 0.70), ("decks", 0.20), ("upload", 0.05), ("login", 0.05))
+
+
+class Recorder:
+    """Задержки и ошибки по именам запросов"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request):
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(elapsed)
+        return response
+
+    def report(self, elapsed: float):
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            print_report(name, {**summarize(self.latencies[name], elapsed), "errors": self.errors[name]})
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        print_report("total", {**summarize(everything, elapsed), "errors": sum(self.errors.values())})
+
+
+def _images(count: int) -> list[bytes]:
+    """Несколько разных PNG: одинаковое содержимое дедуплицируется хранилищем"""
+    from PIL import Image
+    images = []
+    for index in range(count):
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (index * 37 % 256, index * 91 % 256, 128)).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, username: str, images: list[bytes]):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.images = images
+        self.headers: dict[str, str] = {}
+        self.card_ids: list[int] = []
+
+    async def setup(self):
+        await self.login()
+        decks = (await self.client.get(f"{API}/decks/", headers=self.headers)).json()
+        if not decks:
+            raise SystemExit(f"У {self.username} нет колод — сначала запустите benchmarks.seed")
+        cards = await self.client.get(
+            f"{API}/cards/deck/{decks[0]['id']}", params={"limit": 100, "fields": "id"}, headers=self.headers
+        )
+        self.card_ids = [card["id"] for card in cards.json()]
+
+    async def login(self):
+        response = await self.recorder.call("POST /login", self.client.post(
+            f"{API}/login", data={"username": self.username, "password": PASSWORD}
+        ))
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def decks(self):
+        await self.recorder.call("GET /decks", self.client.get(f"{API}/decks/", headers=self.headers))
+
+    async def review(self):
+        response = await self.recorder.call("GET /cards/review", self.client.get(
+            f"{API}/cards/review", params={"limit": 20}, headers=self.headers
+        ))
+        cards = response.json() if response.status_code == 200 else []
+        if not cards:
+            return
+        # В основном верные ответы, иногда — забытые карточки
+        reviews = [{"card_id": card["id"], "quality": random.choice((1, 3, 4, 4, 5, 5))} for card in cards]
+        await self.recorder.call("POST /cards/review/batch", self.client.post(
+            f"{API}/cards/review/batch", json={"reviews": reviews}, headers=self.headers
+        ))
+
+    async def upload(self):
+        card_id = random.choice(self.card_ids)
+        await self.recorder.call("POST /cards/{id}/media", self.client.post(
+            f"{API}/cards/{card_id}/media",
+            files={"file": ("bench.png", random.choice(self.images), "image/png")},
+            headers=self.headers
+        ))
+
+    async def step(self, scenario: str):
+        if scenario == "mixed":
+            scenario = random.choices([name for name, _ in MIX], weights=[weight for _, weight in MIX])[0]
+        await getattr(self, scenario)()
+
+
+@contextlib.asynccontextmanager
+async def _client(base_url: str | None):
+    import httpx
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            yield client
+        return
+
+    from app.main import app
+    workdir, previous = tempfile.TemporaryDirectory(), os.getcwd()
+    # Хранилище медиа пишет в uploads/ относительно текущего каталога
+    os.chdir(workdir.name)
+    try:
+        # ASGITransport не запускает lifespan — поднимаем его сами
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                yield client
+    finally:
+        os.chdir(previous)
+        workdir.cleanup()
+
+
+async def run(args):
+    random.seed(args.seed)
+    images = _images(8)
+    async with _client(args.base_url) as client:
+        recorder = Recorder()
+        users = [
+            VirtualUser(client, recorder, USERNAME.format(index % args.users), images)
+            for index in range(args.concurrency)
+        ]
+        await asyncio.gather(*(user.setup() for user in users))
+        # Вход при подготовке в замер не идёт
+        recorder = Recorder()
+        for user in users:
+            user.recorder = recorder
+
+        deadline = time.perf_counter() + args.duration
+
+        async def loop(user: VirtualUser):
+            while time.perf_counter() < deadline:
+                await user.step(args.scenario)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(loop(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+    target = args.base_url or os.environ.get("DATABASE_URL", "DATABASE_URL по умолчанию")
+    print(f"{args.scenario}: {args.concurrency} клиентов, {elapsed:.1f} с, {target}")
+    recorder.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["review", "decks", "login", "upload", "mixed"], default="mixed")
+    parser.add_argument("--users", type=int, default=20, help="сколько bench-пользователей засеяно")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30, help="секунды")
+    parser.add_argument("--base-url", default=None, help="адрес запущенного сервера; без него — в процессе")
+    parser.add_argument("--database-url", default=None, help="БД для прогона в процессе")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте app.*
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    # Относительный путь SQLite считался бы от временного каталога прогона
+    url = os.environ.get("DATABASE_URL", "")
+    if url.startswith("sqlite:///") and not url.startswith("sqlite:////"):
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.abspath(url[len("sqlite:///"):])
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
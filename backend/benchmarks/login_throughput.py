@@ -0,0 +1,91 @@
+"""
+Пропускная способность проверки паролей при всплеске входов.
+
+Сравнивает прежнюю проверку bcrypt в общем пуле потоков (run_in_threadpool)
+с отдельным ограниченным пулом процессов PasswordHasher. Кроме задержки входа
+меряются отказы 429 (back-pressure) и отставание event loop — столько же
+ждут все остальные запросы воркера, пока идёт всплеск.
+
+Запуск из каталога backend:
+    python -m benchmarks.login_throughput --logins 200 --concurrency 100 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import print_report, probe, summarize
+
+
+async def run(mode: str, hashed: str, logins: int, concurrency: int):
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from app.core.security import verify_password
+    from app.services.password_service import PasswordHasher
+    from app.core.config import settings
+
+    hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_QUEUE)
+    # Прогрев: процессы пула поднимаются при первом обращении
+    if mode == "process":
+        await hasher.verify_and_update("password", hashed)
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    rejected = 0
+
+    async def login_one():
+        nonlocal rejected
+        async with slots:
+            start = time.perf_counter()
+            try:
+                if mode == "threadpool":
+                    await run_in_threadpool(verify_password, "password", hashed)
+                else:
+                    await hasher.verify_and_update("password", hashed)
+            except HTTPException:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login_one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    hasher.close()
+
+    print_report(f"{mode}: login", {**summarize(latencies, elapsed), "rejected": rejected})
+    print_report(f"{mode}: event loop lag", summarize(lags))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12, help="стоимость bcrypt")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--queue", type=int, default=None, help="длина очереди (PASSWORD_HASH_QUEUE)")
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте app.*, и их же унаследуют процессы пула
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    if args.queue is not None:
+        os.environ["PASSWORD_HASH_QUEUE"] = str(args.queue)
+
+    from app.core.security import get_password_hash
+    hashed = get_password_hash("password")
+    print(f"bcrypt rounds: {args.rounds}, logins: {args.logins}, concurrency: {args.concurrency}")
+
+    for mode in ("threadpool", "process"):
+        asyncio.run(run(mode, hashed, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Микробенчмарки горячих функций без HTTP и БД.
+
+  srs_calculate_next_review  — SM-2 для одной карточки (как в старом пути ответа);
+  srs_calculate_next_reviews — векторизованный SM-2 на пачку, в пересчёте на карточку;
+  srs_fuzz                   — разброс интервалов пачки общим генератором процесса, на карточку;
+  card_response_validate     — CardResponse.model_validate из ORM-объекта;
+  card_response_json         — model_validate + model_dump_json для одной карточки;
+  card_page_json             — страница из --page карточек через TypeAdapter(list[CardResponse]).
+
+Каждая операция повторяется пачками по --number вызовов; перцентили (в микросекундах) —
+по времени одного вызова внутри пачки, ops_s — вызовов в секунду.
+
+Запуск из каталога backend:
+    python -m benchmarks.micro --repeat 200 --number 1000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from benchmarks.common import print_report, summarize
+
+
+def measure(function, repeat: int, number: int, per_call: int = 1) -> dict:
+    """Время одного вызова (с) в каждой из repeat пачек по number вызовов"""
+    for _ in range(min(number, 100)):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / (number * per_call))
+    # summarize отдаёт миллисекунды — здесь удобнее микросекунды
+    summary = {
+        key.replace("_ms", "_us"): value * 1000 if key.endswith("_ms") else value
+        for key, value in summarize(timings).items()
+    }
+    summary["ops_s"] = 1e6 / summary["p50_us"] if summary["p50_us"] else 0.0
+    return summary
+
+
+def _cards(count: int) -> list:
+    from app import models
+    now = datetime.utcnow()
+    return [
+        models.Card(
+            id=index, question=f"question {index}", answer=f"answer {index}", deck_id=1,
+            ease_factor=2.5, interval=index % 30, repetitions=index % 5,
+            next_review=now + timedelta(days=index % 30), last_review=now,
+            created_at=now, updated_at=now
+        )
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--page", type=int, default=100, help="карточек на странице для card_page_json")
+    args = parser.parse_args()
+
+    from pydantic import TypeAdapter
+    from app.schemas.card import CardResponse
+    from app.services.srs_service import SRSBatch, SRSReview, SRSService
+
+    rng = random.Random(42)
+    states = [SRSReview(ease_factor=2.5, interval=rng.randint(0, 60), repetitions=rng.randint(0, 6)) for _ in range(1000)]
+    counter = iter(range(10 ** 12))
+
+    def single():
+        index = next(counter) % len(states)
+        state = states[index]
+        SRSService.calculate_next_review(
+            4, SRSReview(ease_factor=state.ease_factor, interval=state.interval, repetitions=state.repetitions)
+        )
+
+    batch_size = 1000
+    batch = SRSBatch(
+        ease_factor=np.full(batch_size, 2.5),
+        interval=np.array([state.interval for state in states]),
+        repetitions=np.array([state.repetitions for state in states])
+    )
+    quality = np.random.default_rng(42).integers(0, 6, size=batch_size)
+    intervals = np.array([max(state.interval, 1) for state in states])
+
+    cards = _cards(max(args.page, 1))
+    card = cards[1]
+    page = TypeAdapter(list[CardResponse])
+
+    print_report("srs_calculate_next_review", measure(single, args.repeat, args.number))
+    print_report("srs_calculate_next_reviews", measure(
+        lambda: SRSService.calculate_next_reviews(quality, batch), args.repeat, max(1, args.number // 100), batch_size
+    ))
+    print_report("srs_fuzz", measure(
+        lambda: SRSService.fuzz(intervals), args.repeat, max(1, args.number // 100), batch_size
+    ))
+    print_report("card_response_validate", measure(lambda: CardResponse.model_validate(card), args.repeat, args.number))
+    print_report("card_response_json", measure(
+        lambda: CardResponse.model_validate(card).model_dump_json(), args.repeat, args.number
+    ))
+    print_report(f"card_page_json ({args.page})", measure(
+        lambda: page.dump_json([CardResponse.model_validate(item) for item in cards]),
+        args.repeat, max(1, args.number // args.page)
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Прогон синтетического журнала повторений через планировщики SM-2 и FSRS.
+
+Журнал строится по «истинной» модели памяти, которую не знает ни один планировщик:
+у каждой карточки своя скорость роста стабильности S, а вероятность вспомнить
+падает экспоненциально: 0.9 ** (t / S). Затем журнал проигрывается через каждый
+планировщик раундами (k-й ответ каждой карточки — один векторизованный проход),
+как это делает review_service.apply_reviews.
+
+Метрики:
+  events_per_s   — пропускная способность планировщика;
+  log_loss/brier — насколько хорошо предсказанная вероятность вспомнить
+                   совпадает с фактическими ответами журнала;
+  retention      — истинная вероятность вспомнить к моменту, который назначил
+                   планировщик (сколько пользователь реально удержит);
+  mean_interval  — средний назначенный интервал в днях (обратная сторона нагрузки).
+
+Запуск из каталога backend:
+    python -m benchmarks.scheduler_replay --events 2000000 --cards 200000
+"""
+import argparse
+import time
+from dataclasses import dataclass
+import numpy as np
+
+from benchmarks.common import print_report
+from app.services.schedulers import CardStates, FSRSScheduler, SM2Scheduler, Scheduler
+
+
+@dataclass
+class ReviewLog:
+    """Журнал по раундам: массивы формы (rounds, cards)"""
+    quality: np.ndarray
+    elapsed_days: np.ndarray
+    recalled: np.ndarray
+    true_stability: np.ndarray  # истинная стабильность после ответа
+
+
+def make_log(cards: int, rounds: int, seed: int) -> ReviewLog:
+    rng = np.random.default_rng(seed)
+    growth = rng.uniform(1.5, 3.5, cards)   # лёгкие карточки закрепляются быстрее
+    stability = rng.uniform(0.5, 2.0, cards)
+
+    quality = np.empty((rounds, cards), dtype=np.int64)
+    elapsed = np.empty((rounds, cards), dtype=np.float64)
+    recalled = np.empty((rounds, cards), dtype=bool)
+    true_stability = np.empty((rounds, cards), dtype=np.float64)
+
+    for round_number in range(rounds):
+        if round_number == 0:
+            elapsed[0] = 0.0
+            probability = np.full(cards, 0.7)  # первый показ новой карточки
+        else:
+            # Пользователь повторяет не строго по расписанию
+            elapsed[round_number] = np.maximum(1.0, np.rint(stability * rng.lognormal(0.0, 0.7, cards)))
+            probability = 0.9 ** (elapsed[round_number] / stability)
+
+        success = rng.random(cards) < probability
+        recalled[round_number] = success
+        quality[round_number] = np.where(
+            success,
+            np.where(probability > 0.9, 5, np.where(probability > 0.6, 4, 3)),
+            rng.integers(0, 3, cards)
+        )
+        # Стабильность ограничена сотней лет, как и максимальный интервал планировщиков
+        stability = np.where(success, np.minimum(36500, stability * growth), np.maximum(0.5, stability * 0.3))
+        true_stability[round_number] = stability
+
+    return ReviewLog(quality=quality, elapsed_days=elapsed, recalled=recalled, true_stability=true_stability)
+
+
+def new_states(cards: int) -> CardStates:
+    return CardStates(
+        ease_factor=np.full(cards, 2.5),
+        interval=np.zeros(cards, dtype=np.int64),
+        repetitions=np.zeros(cards, dtype=np.int64),
+        stability=np.full(cards, np.nan),
+        difficulty=np.full(cards, np.nan),
+    )
+
+
+def replay(scheduler: Scheduler, log: ReviewLog) -> dict:
+    rounds, cards = log.quality.shape
+    states = new_states(cards)
+    predicted = []
+    intervals = []
+    retention = []
+
+    engine_time = 0.0
+    for round_number in range(rounds):
+        elapsed = log.elapsed_days[round_number]
+        if round_number > 0:
+            predicted.append(scheduler.retrievability(states, elapsed))
+
+        started = time.perf_counter()
+        states = scheduler.review(log.quality[round_number], states, elapsed)
+        engine_time += time.perf_counter() - started
+
+        intervals.append(states.interval)
+        retention.append(0.9 ** (states.interval / log.true_stability[round_number]))
+
+    events = rounds * cards
+    probability = np.clip(np.concatenate(predicted), 1e-6, 1 - 1e-6)
+    outcome = log.recalled[1:].ravel()
+    return {
+        "events": events,
+        "events_per_s": events / engine_time,
+        "log_loss": float(-np.mean(np.where(outcome, np.log(probability), np.log(1 - probability)))),
+        "brier": float(np.mean((probability - outcome) ** 2)),
+        "retention": float(np.mean(np.concatenate(retention))),
+        "mean_interval": float(np.mean(np.concatenate(intervals))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--cards", type=int, default=200_000)
+    parser.add_argument("--retention", type=float, default=0.9, help="desired_retention для FSRS")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rounds = max(2, args.events // args.cards)
+    started = time.perf_counter()
+    log = make_log(args.cards, rounds, args.seed)
+    print(f"log: {rounds * args.cards} events, {args.cards} cards, {rounds} reviews per card, "
+          f"built in {time.perf_counter() - started:.1f}s")
+
+    for scheduler in (SM2Scheduler(), FSRSScheduler(desired_retention=args.retention)):
+        print_report(scheduler.name, replay(scheduler, log))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Стоимость выдачи большой колоды: выборка и сериализация карточек в JSON.
+
+Три пути для одних и тех же --cards карточек:
+  orm+pydantic   — ORM-объекты, response_model=list[CardResponse] (from_attributes),
+                   как FastAPI: validate -> dump_python(mode="json") -> json.dumps;
+  rows+json      — сырые строки колонок, словари с isoformat() и json.dumps;
+  rows+orjson    — сырые строки колонок и orjson (page_response / json_response).
+
+Выборка (fetch) и сериализация (serialize) меряются отдельно; цифры приводятся
+к 10 000 карточек, чтобы прогоны с разным --cards сравнивались напрямую.
+
+Без --database-url используется временная SQLite; в указанной БД создаётся
+и потом удаляется отдельный пользователь с одной колодой.
+
+Запуск из каталога backend:
+    python -m benchmarks.serialization --cards 10000 --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+
+from benchmarks.common import print_report, summarize
+from benchmarks.seed import card_rows
+
+USERNAME = "bench_serialization"
+
+
+async def _timed(function, repeat: int, scale: float) -> tuple[dict, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        if asyncio.iscoroutine(result):
+            result = await result
+        timings.append((time.perf_counter() - start) * scale)
+    return summarize(timings), result
+
+
+async def run(cards: int, repeat: int):
+    import orjson
+    from pydantic import TypeAdapter
+    from sqlalchemy import delete, insert, select
+    from app import models
+    from app.api.pagination import parse_fields, rows_to_dicts
+    from app.database import AsyncSessionLocal, async_engine
+    from app.schemas.card import CardResponse
+
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.User).where(models.User.username == USERNAME))
+        user_id = await db.scalar(insert(models.User).returning(models.User.id).values(
+            email=f"{USERNAME}@example.com", username=USERNAME, hashed_password="-", created_at=now, updated_at=now
+        ))
+        deck_id = await db.scalar(insert(models.Deck).returning(models.Deck.id).values(
+            title="Serialization", description="", user_id=user_id, created_at=now, updated_at=now
+        ))
+        rows = card_rows(np.random.default_rng(42), deck_id, cards, 0.2, now)
+        for offset in range(0, len(rows), 5000):
+            await db.execute(insert(models.Card), rows[offset:offset + 5000])
+        await db.commit()
+
+    adapter = TypeAdapter(list[CardResponse])
+    entities = select(models.Card).where(models.Card.deck_id == deck_id).order_by(models.Card.id)
+    columns = (
+        select(*parse_fields(None, models.Card, CardResponse))
+        .where(models.Card.deck_id == deck_id)
+        .order_by(models.Card.id)
+    )
+
+    def as_json(rows):
+        return json.dumps([
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+            for row in rows_to_dicts(rows)
+        ], ensure_ascii=False).encode()
+
+    def as_pydantic(objects):
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False).encode()
+
+    scale = 10_000 / cards
+    print(f"{cards} карточек, {repeat} повторов; время — на 10 000 карточек")
+    try:
+        async with AsyncSessionLocal() as db:
+            async def fetch_entities():
+                db.expunge_all()
+                return (await db.scalars(entities)).all()
+
+            async def fetch_rows():
+                return (await db.execute(columns)).all()
+
+            summary, objects = await _timed(fetch_entities, repeat, scale)
+            print_report("orm+pydantic fetch", summary)
+            summary, pydantic_body = await _timed(lambda: as_pydantic(objects), repeat, scale)
+            print_report("orm+pydantic serialize", summary)
+
+            summary, rows = await _timed(fetch_rows, repeat, scale)
+            print_report("rows fetch", summary)
+            summary, json_body = await _timed(lambda: as_json(rows), repeat, scale)
+            print_report("rows+json serialize", summary)
+            summary, orjson_body = await _timed(lambda: orjson.dumps(rows_to_dicts(rows)), repeat, scale)
+            print_report("rows+orjson serialize", summary)
+
+        # Все три пути должны отдавать одно и то же
+        assert json.loads(pydantic_body) == json.loads(json_body) == orjson.loads(orjson_body)
+        print(f"  тело ответа: {len(orjson_body) / 1024:.0f} КБ")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.username == USERNAME))
+            await db.commit()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Настройки читаются при импорте app.*
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'serialization.db')}"
+        from app.database import upgrade_schema
+        upgrade_schema()
+        asyncio.run(run(args.cards, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Задержка загрузки изображений при параллельных запросах.
+
+Сравнивает прежнюю реализацию (copyfileobj и миниатюра прямо в event loop)
+с потоковой записью и фоновыми миниатюрами. Кроме задержки самих загрузок
+меряется отставание event loop — столько же ждут все остальные запросы воркера.
+
+Запуск из каталога backend:
+    python -m benchmarks.upload_latency --uploads 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from PIL import Image
+from starlette.datastructures import Headers, UploadFile
+
+from benchmarks.common import print_report, probe, summarize
+
+
+def make_image(width: int, height: int) -> bytes:
+    """Шумное изображение: плохо сжимается, поэтому файл получается крупным"""
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def make_upload(data: bytes) -> UploadFile:
+    # Хвост после маркера конца JPEG декодер игнорирует, а хэш содержимого
+    # становится уникальным — иначе хранилище отдаст уже сохранённый блоб
+    return UploadFile(
+        io.BytesIO(data + uuid.uuid4().bytes),
+        filename="photo.jpg",
+        headers=Headers({"content-type": "image/jpeg"})
+    )
+
+
+async def legacy_save(service, upload: UploadFile):
+    """Прежняя реализация save_image: всё синхронно внутри event loop"""
+    from app.services.file_service import _make_thumbnail
+
+    file_path = os.path.join(service.images_dir, f"{uuid.uuid4()}.jpg")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+    _make_thumbnail(file_path, (200, 200))
+
+
+async def run(mode: str, data: bytes, uploads: int, concurrency: int):
+    from app.services.file_service import FileService
+
+    service = FileService()
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def upload_one():
+        async with slots:
+            upload = make_upload(data)
+            start = time.perf_counter()
+            if mode == "legacy":
+                await legacy_save(service, upload)
+            else:
+                await service.save_image(upload)
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload_one() for _ in range(uploads)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    # Дожидаемся фоновых миниатюр, чтобы они не мешали следующему прогону
+    await asyncio.gather(*list(service._thumbnail_tasks))
+    service.close()
+
+    print_report(f"{mode}: upload", summarize(latencies, elapsed))
+    print_report(f"{mode}: event loop lag", summarize(lags))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = make_image(args.width, args.height)
+    print(f"image size: {len(data) / 1024 / 1024:.1f} MiB, uploads: {args.uploads}, concurrency: {args.concurrency}")
+
+    # Все файлы пишем во временный каталог, чтобы не засорять uploads/
+    workdir = tempfile.mkdtemp(prefix="flashlearn-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for mode in ("legacy", "streaming"):
+            asyncio.run(run(mode, data, args.uploads, args.concurrency))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
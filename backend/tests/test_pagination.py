@@ -0,0 +1,42 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app import models
+from app.api.pagination import decode_cursor, encode_cursor, keyset_after
+
+
+@pytest.mark.parametrize("values, types", [
+    ((42,), (int,)),
+    ((datetime(2024, 3, 1, 12, 30, 15, 123456), 7), (datetime, int)),
+    ((-3.25, 9), (float, int)),
+    (("2024-03-01", 120), (str, int)),
+])
+def test_cursor_round_trip(values, types):
+    cursor = encode_cursor(*values)
+    assert decode_cursor(cursor, *types) == list(values)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("привет ?&/+", 10 ** 12)
+    assert "=" not in cursor
+    assert all(char.isalnum() or char in "-_" for char in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(1, 2), encode_cursor("x")])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, int)
+    assert error.value.status_code == 400
+
+
+def test_keyset_after_continues_strictly_after_cursor():
+    query = keyset_after(select(models.Card.id), models.Card.id, encode_cursor(15))
+    compiled = query.compile(compile_kwargs={"literal_binds": True})
+    assert "cards.id > 15" in str(compiled)
+    assert str(compiled).rstrip().endswith("ORDER BY cards.id")
+
+
+def test_keyset_after_without_cursor_only_sorts():
+    query = keyset_after(select(models.Card.id), models.Card.id, None)
+    assert "WHERE" not in str(query)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from app.services.schedulers import CardStates, FSRSScheduler, SM2Scheduler, get_scheduler
+from app.services.srs_service import SRSBatch, SRSReview, SRSService
+
+
+def _random_states(rng: np.random.Generator, size: int, fsrs_share: float = 0.5) -> CardStates:
+    """Смесь новых карточек, карточек SM-2 и карточек, которые уже вёл FSRS"""
+    stability = rng.uniform(0.1, 400, size)
+    difficulty = rng.uniform(1, 10, size)
+    without_fsrs = rng.random(size) >= fsrs_share
+    stability[without_fsrs] = np.nan
+    difficulty[without_fsrs] = np.nan
+    return CardStates(
+        ease_factor=rng.uniform(1.3, 3.0, size),
+        interval=rng.integers(0, 400, size),
+        repetitions=rng.integers(0, 12, size),
+        stability=stability,
+        difficulty=difficulty,
+    )
+
+
+def test_vectorized_sm2_matches_scalar():
+    rng = np.random.default_rng(4)
+    quality = rng.integers(0, 6, 2000)
+    batch = SRSBatch(
+        ease_factor=rng.uniform(1.3, 3.0, 2000),
+        interval=rng.integers(0, 400, 2000),
+        repetitions=rng.integers(0, 12, 2000),
+    )
+
+    reviewed = SRSService.calculate_next_reviews(quality, batch)
+
+    for slot in range(len(quality)):
+        expected = SRSService.calculate_next_review(int(quality[slot]), SRSReview(
+            ease_factor=float(batch.ease_factor[slot]),
+            interval=int(batch.interval[slot]),
+            repetitions=int(batch.repetitions[slot]),
+        ))
+        assert reviewed.interval[slot] == expected.interval
+        assert reviewed.repetitions[slot] == expected.repetitions
+        assert reviewed.ease_factor[slot] == pytest.approx(expected.ease_factor)
+
+
+def test_sm2_rounds_half_to_even_like_round():
+    # 5 * 2.5 = 12.5: round() и np.rint дают 12
+    reviewed = SRSService.calculate_next_reviews(
+        np.array([4]), SRSBatch(ease_factor=np.array([2.5]), interval=np.array([5]), repetitions=np.array([2]))
+    )
+    assert reviewed.interval[0] == round(5 * 2.5) == 12
+
+
+@pytest.mark.parametrize("scheduler", [SM2Scheduler(), FSRSScheduler(), FSRSScheduler(desired_retention=0.8)])
+def test_batch_review_matches_card_by_card(scheduler):
+    rng = np.random.default_rng(7)
+    states = _random_states(rng, 500)
+    quality = rng.integers(0, 6, 500)
+    elapsed = rng.uniform(0, 200, 500)
+
+    batch = scheduler.review(quality, states, elapsed)
+
+    for slot in range(500):
+        one = scheduler.review(quality[slot:slot + 1], states.take(np.array([slot])), elapsed[slot:slot + 1])
+        for field in ("ease_factor", "interval", "repetitions", "stability", "difficulty"):
+            np.testing.assert_allclose(getattr(batch, field)[slot], getattr(one, field)[0], equal_nan=True)
+
+
+def test_batch_reschedule_matches_card_by_card():
+    scheduler = FSRSScheduler(desired_retention=0.85)
+    states = _random_states(np.random.default_rng(11), 300)
+
+    batch = scheduler.reschedule(states)
+
+    for slot in range(300):
+        one = scheduler.reschedule(states.take(np.array([slot])))
+        assert batch.interval[slot] == one.interval[0]
+        np.testing.assert_allclose(batch.stability[slot], one.stability[0], equal_nan=True)
+
+
+def test_review_does_not_modify_input_states():
+    states = _random_states(np.random.default_rng(3), 50)
+    before = {field: getattr(states, field).copy() for field in ("interval", "stability", "difficulty")}
+
+    for scheduler in (SM2Scheduler(), FSRSScheduler()):
+        scheduler.review(np.full(50, 4), states, np.full(50, 10.0))
+        scheduler.reschedule(states)
+
+    for field, values in before.items():
+        np.testing.assert_array_equal(getattr(states, field), values)
+
+
+def test_fsrs_interval_at_desired_retention():
+    # Стабильность S — число дней до 90% припоминания, поэтому при цели 0.9 интервал равен S
+    scheduler = FSRSScheduler(desired_retention=0.9)
+    assert list(scheduler.next_interval(np.array([1.0, 10.0, 100.0]))) == [1, 10, 100]
+
+
+def test_get_scheduler():
+    assert isinstance(get_scheduler(None), SM2Scheduler)
+    fsrs = get_scheduler("fsrs", 0.8)
+    assert isinstance(fsrs, FSRSScheduler) and fsrs.desired_retention == 0.8